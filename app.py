@@ -5,17 +5,90 @@ DuckRSS - Haupt-Anwendung
 """
 
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response
+from werkzeug.middleware.proxy_fix import ProxyFix
+import os
 import secrets
+import tempfile
+import database
 from auth import Auth
-from rss_manager import RSSManager
+from ratelimit import RateLimited, login_limiter
+from rss_manager import RSSManager, DEFAULT_ITEM_LIMIT, MAX_ITEM_LIMIT
+from retention import RETENTION_DAYS, RETENTION_COUNT
 from database import get_db
+import metrics
+from metrics import Counter
 import traceback
 
 app = Flask(__name__)
+# Nur für den Import ohne create_app(); Sitzungen überleben keinen Neustart
 app.secret_key = secrets.token_hex(32)
 
+# Fester Secret Key (sonst: Schlüsseldatei neben der Datenbank)
+SECRET_KEY = os.environ.get('DUCKRSS_SECRET_KEY', '')
+SECRET_KEY_FILE = os.environ.get('DUCKRSS_SECRET_KEY_FILE', '')
+
+# Debug-Modus des Entwicklungsservers (python3 app.py), nie in Produktion
+DEBUG = os.environ.get('DUCKRSS_DEBUG', '0') == '1'
+
+# Anzahl vorgeschalteter Reverse-Proxies, deren X-Forwarded-For vertraut wird;
+# sonst teilen sich alle Clients hinter dem Proxy eine IP-Begrenzung
+PROXY_HOPS = int(os.environ.get('DUCKRSS_PROXY_HOPS', 0))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+
+def load_secret_key(path=None):
+    """Secret Key laden, beim ersten Aufruf zufällig erzeugen und speichern
+    
+    Alle Worker-Prozesse müssen denselben Schlüssel verwenden, sonst sind
+    Sitzungen nur im Prozess gültig, der sie ausgestellt hat. Die Datei wird
+    per link() angelegt: starten mehrere Prozesse gleichzeitig, gewinnt genau
+    einer, die anderen lesen dessen Schlüssel.
+    """
+    if SECRET_KEY:
+        return SECRET_KEY
+    path = path or SECRET_KEY_FILE or os.path.join(os.path.dirname(database.DB_PATH) or '.', 'secret_key')
+    if not os.path.exists(path):
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.secret_key-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+    with open(path) as f:
+        return f.read().strip()
+
+def create_app():
+    """WSGI-Anwendung für den Produktivbetrieb (gunicorn/uwsgi: wsgi:app)
+    
+    Die Datenbank wird hier nicht initialisiert: das geschieht einmal vor dem
+    Start der Worker (gunicorn.conf.py: on_starting, sonst python3 database.py).
+    """
+    app.secret_key = load_secret_key()
+    return app
+
+FEED_BYTES = Counter('duckrss_feed_bytes_total', 'Ausgelieferte Bytes öffentlicher Feeds', ('encoding',))
+FEED_RESPONSES = Counter('duckrss_feed_responses_total', 'Antworten öffentlicher Feeds nach Status', ('status',))
+LOGINS = Counter('duckrss_logins_total', 'Anmeldeversuche nach Ergebnis', ('result',))
+
 # ============== Hilfsfunktionen ==============
 
+def too_many_attempts(template, error):
+    """429 mit Retry-After statt weiterer bcrypt-Arbeit"""
+    return render_template(template,
+        error=f'Zu viele Versuche. Bitte in {error.retry_after} Sekunden erneut versuchen.'), \
+        429, {'Retry-After': str(error.retry_after)}
+
+def counted_chunks(chunks, encoding):
+    """Ausgelieferte Bytes eines gestreamten Feeds zählen"""
+    for chunk in chunks:
+        FEED_BYTES.inc(len(chunk), encoding=encoding)
+        yield chunk
+
 def login_required(f):
     """Decorator für geschützte Routen"""
     def wrapper(*args, **kwargs):
@@ -53,11 +126,19 @@ def register():
             return render_template('register.html', 
                 error=f'Bitte mindestens {required_passwords} Passwörter angeben')
         
+        # Jedes Passwort wird mit bcrypt gehasht
+        try:
+            login_limiter.check_ip(request.remote_addr)
+        except RateLimited as e:
+            return too_many_attempts('register.html', e)
+        
         try:
             user_id = Auth.create_user(username, passwords, required_passwords, required_passkeys)
             session['user_id'] = user_id
             session['username'] = username
             return redirect(url_for('dashboard'))
+        except RateLimited as e:
+            return too_many_attempts('register.html', e)
         except Exception as e:
             return render_template('register.html', error='Benutzername bereits vergeben')
     
@@ -76,8 +157,14 @@ def login():
             if pw:
                 passwords.append(pw)
         
-        user = Auth.verify_user(username, passwords)
+        try:
+            login_limiter.check(username, request.remote_addr)
+            user = Auth.verify_user(username, passwords)
+        except RateLimited as e:
+            LOGINS.inc(result='limited')
+            return too_many_attempts('login.html', e)
         
+        LOGINS.inc(result='ok' if user else 'failed')
         if user:
             session['user_id'] = user['id']
             session['username'] = user['username']
@@ -121,7 +208,9 @@ def inputs():
     
     return render_template('inputs.html', 
         inputs=inputs,
-        outputs=outputs)
+        outputs=outputs,
+        retention_days=RETENTION_DAYS,
+        retention_count=RETENTION_COUNT)
 
 @app.route('/inputs/create', methods=['POST'])
 @login_required
@@ -156,6 +245,15 @@ def link_input(input_id):
         RSSManager.link_input_to_output(input_id, int(output_id))
     return redirect(url_for('inputs'))
 
+@app.route('/inputs/<int:input_id>/retention', methods=['POST'])
+@login_required
+def set_input_retention(input_id):
+    """Aufbewahrung alter Items ändern"""
+    user_id = session['user_id']
+    RSSManager.set_input_retention(user_id, input_id,
+        request.form.get('retention_days'), request.form.get('retention_count'))
+    return redirect(url_for('inputs'))
+
 # ============== Ausgänge ==============
 
 @app.route('/outputs')
@@ -170,7 +268,9 @@ def outputs():
     
     return render_template('outputs.html', 
         outputs=outputs,
-        base_url=base_url)
+        base_url=base_url,
+        default_item_limit=DEFAULT_ITEM_LIMIT,
+        max_item_limit=MAX_ITEM_LIMIT)
 
 @app.route('/outputs/create', methods=['POST'])
 @login_required
@@ -179,8 +279,17 @@ def create_output():
     user_id = session['user_id']
     name = request.form.get('name')
     description = request.form.get('description', '')
+    item_limit = request.form.get('item_limit', DEFAULT_ITEM_LIMIT)
     
-    RSSManager.create_output(user_id, name, description)
+    RSSManager.create_output(user_id, name, description, item_limit)
+    return redirect(url_for('outputs'))
+
+@app.route('/outputs/<int:output_id>/limit', methods=['POST'])
+@login_required
+def set_output_limit(output_id):
+    """Anzahl Items im öffentlichen Feed ändern"""
+    user_id = session['user_id']
+    RSSManager.set_output_item_limit(user_id, output_id, request.form.get('item_limit'))
     return redirect(url_for('outputs'))
 
 # ============== Feed Items ==============
@@ -190,12 +299,18 @@ def create_output():
 def feeds():
     """Alle Feed-Items anzeigen"""
     user_id = session['user_id']
-    items = RSSManager.get_all_items(user_id)
+    before = request.args.get('before')
+    try:
+        items, next_cursor = RSSManager.get_items_page(user_id, before)
+    except ValueError:
+        return redirect(url_for('feeds'))
     outputs = RSSManager.get_outputs(user_id)
     
     return render_template('feeds.html', 
         items=items,
-        outputs=outputs)
+        outputs=outputs,
+        before=before,
+        next_cursor=next_cursor)
 
 @app.route('/feeds/<int:item_id>/share', methods=['POST'])
 @login_required
@@ -234,23 +349,65 @@ def create_custom_feed():
 def rss_feed(slug):
     """Öffentlicher RSS Feed (keine Authentifizierung!) - WITH ERROR HANDLING"""
     try:
-        xml = RSSManager.get_output_feed(slug)
+        # Ältere Seiten (RFC 5005) über ?before=<cursor>
+        before = request.args.get('before')
+        validators = RSSManager.get_output_validators(slug, before)
+        if not validators:
+            FEED_RESPONSES.inc(status='404')
+            return 'Feed nicht gefunden', 404
+        
+        # Komprimiert wird nur die gecachte erste Seite
+        encoding = None if before else RSSManager.choose_encoding(request.accept_encodings)
         
-        if xml:
-            return Response(xml, mimetype='application/rss+xml; charset=utf-8')
+        # Conditional GET: unveränderte Feeds ohne Rendern beantworten
+        if RSSManager.is_not_modified(validators, request.if_none_match, request.if_modified_since):
+            response = Response(status=304)
+        elif encoding:
+            body = RSSManager.get_encoded_feed(slug, encoding)
+            if body is None:
+                return 'Feed nicht gefunden', 404
+            response = Response(body, mimetype='application/rss+xml; charset=utf-8')
+            response.content_encoding = encoding
+            FEED_BYTES.inc(len(body), encoding=encoding)
         else:
-            return 'Feed nicht gefunden', 404
+            try:
+                chunks = RSSManager.stream_output_feed(slug, before)
+            except ValueError:
+                FEED_RESPONSES.inc(status='400')
+                return 'Ungültiger Cursor', 400
+            if chunks is None:
+                return 'Feed nicht gefunden', 404
+            if metrics.METRICS_ENABLED:
+                chunks = counted_chunks(chunks, 'identity')
+            response = Response(chunks, mimetype='application/rss+xml; charset=utf-8')
+        
+        # Schwaches ETag: gilt für alle Kodierungen derselben Fassung
+        response.set_etag(validators['etag'], weak=True)
+        response.last_modified = validators['last_modified']
+        response.vary.add('Accept-Encoding')
+        FEED_RESPONSES.inc(status=str(response.status_code))
+        return response
     except Exception as e:
+        FEED_RESPONSES.inc(status='500')
         # Debugging: Fehler ausgeben
         app.logger.error(f"Error generating RSS feed for {slug}: {str(e)}")
         app.logger.error(traceback.format_exc())
         return f'Fehler beim Generieren des Feeds: {str(e)}', 500
 
+# ============== Metriken ==============
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metriken im Prometheus-Format (nur mit DUCKRSS_METRICS=1)"""
+    if not metrics.METRICS_ENABLED:
+        return 'Metriken sind deaktiviert', 404
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # ============== Server starten ==============
 
 if __name__ == '__main__':
-    from database import init_db
-    init_db()
+    database.init_db()
+    create_app()
     
     print("")
     print("=" * 50)
@@ -260,6 +417,7 @@ if __name__ == '__main__':
     print("   URL: http://localhost:5000")
     print("")
     print("   Strg+C zum Beenden")
+    print("   Produktion: gunicorn -c gunicorn.conf.py wsgi:app")
     print("")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=DEBUG)
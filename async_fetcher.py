@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Asynchroner Abruf vieler Eingänge (asyncio + aiohttp)
+"""
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+import asyncio
+import logging
+import os
+import time
+from database import get_db
+from rss_manager import RSSManager, FETCH_TIMEOUT, FETCH_MAX_BYTES, _max_age
+
+logger = logging.getLogger('duckrss.async_fetcher')
+
+ASYNC_CONCURRENCY = int(os.environ.get('DUCKRSS_ASYNC_CONCURRENCY', 100))
+ASYNC_PER_HOST = int(os.environ.get('DUCKRSS_ASYNC_PER_HOST', 4))
+
+class AsyncFetcher:
+    """Lädt viele Feeds gleichzeitig über gepoolte Keep-Alive-Verbindungen
+
+    concurrency: gleichzeitige Downloads insgesamt
+    per_host: gleichzeitige Verbindungen pro Host
+    timeout: Zeitlimit pro Abruf in Sekunden
+    max_bytes: Abbruch bei größeren Antworten
+    parse: optionale Funktion (bytes, headers) -> parse_feed()-Ergebnis (z.B. Prozess-Pool)
+
+    Parsen und Speichern laufen in Threads, damit die Event-Loop
+    währenddessen weiter herunterlädt.
+    """
+
+    def __init__(self, concurrency=ASYNC_CONCURRENCY, per_host=ASYNC_PER_HOST,
+                 timeout=FETCH_TIMEOUT, max_bytes=FETCH_MAX_BYTES, parse=None):
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError('aiohttp nicht verfügbar - bitte python3-aiohttp installieren')
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.parse = parse
+
+    def run(self, input_ids=None):
+        """Eingänge (Standard: alle aktiven) einmal abrufen und speichern
+
+        Liefert eine Statistik mit fetched, not_modified, failed, seconds
+        und feeds_per_second.
+        """
+        return asyncio.run(self.fetch_and_store(self._load_inputs(input_ids)))
+
+    def _load_inputs(self, input_ids):
+        conn = get_db()
+        cursor = conn.cursor()
+        if input_ids is None:
+            cursor.execute('SELECT id, feed_url, etag, last_modified, content_hash FROM inputs WHERE active = 1')
+        else:
+            input_ids = list(input_ids)
+            cursor.execute(f'''
+                SELECT id, feed_url, etag, last_modified, content_hash FROM inputs
+                WHERE id IN ({','.join('?' * len(input_ids))})
+            ''', input_ids)
+        inputs = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return inputs
+
+    async def fetch_and_store(self, inputs):
+        """Alle Eingänge herunterladen, fertige Downloads sofort verarbeiten"""
+        loop = asyncio.get_running_loop()
+        stats = {'fetched': 0, 'not_modified': 0, 'failed': 0}
+        started = time.perf_counter()
+
+        async def handle(session, input_feed):
+            try:
+                response = await self.download(session, input_feed)
+                ok = await loop.run_in_executor(
+                    None, RSSManager.process_download, input_feed, response, self.parse)
+            except Exception as e:
+                # repr: TimeoutError u.a. haben keinen Text, der Typ steht immer da
+                logger.warning('Eingang %s: %r', input_feed['id'], e)
+                response, ok = None, False
+            await loop.run_in_executor(None, RSSManager.record_fetch_result, input_feed['id'], ok)
+
+            if not ok:
+                stats['failed'] += 1
+            elif response['status'] == 304:
+                stats['not_modified'] += 1
+            else:
+                stats['fetched'] += 1
+
+        async with self.session() as session:
+            await asyncio.gather(*(handle(session, input_feed) for input_feed in inputs))
+
+        stats['seconds'] = time.perf_counter() - started
+        stats['feeds_per_second'] = len(inputs) / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    def session(self):
+        """ClientSession mit begrenztem Verbindungs-Pool
+
+        Das Zeitlimit gilt pro Anfrage ab deren Start; damit Anfragen nicht
+        schon beim Warten auf eine freie Verbindung ablaufen, lässt
+        download() höchstens concurrency Anfragen gleichzeitig starten.
+        """
+        # Pro Session neu: ein Semaphore gehört zur Event-Loop, in der er wartet
+        self._slots = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            auto_decompress=True,
+        )
+
+    async def download(self, session, input_feed):
+        """Einzelnen Feed laden, Ergebnis wie RSSManager._download"""
+        headers = RSSManager._request_headers(input_feed)
+        async with self._slots, session.get(input_feed['feed_url'], headers=headers) as response:
+            body = bytearray()
+            if response.status == 200:
+                async for chunk in response.content.iter_chunked(65536):
+                    body += chunk
+                    if len(body) > self.max_bytes:
+                        raise ValueError(f'Feed größer als {self.max_bytes} Bytes')
+
+            return {
+                'status': response.status,
+                'body': bytes(body),
+                'etag': response.headers.get('ETag', input_feed.get('etag')),
+                'last_modified': response.headers.get('Last-Modified', input_feed.get('last_modified')),
+                'max_age': _max_age(response.headers.get('Cache-Control')),
+                'url': str(response.url),
+                'content_type': response.headers.get('Content-Type'),
+            }
@@ -5,14 +5,104 @@ DuckRSS - Authentifizierung
 """
 
 import bcrypt
+import os
 import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from cache import user_cache
 from database import get_db
+from metrics import Counter, Histogram, instrument, timer
+from ratelimit import RateLimited
 
+# Arbeitsfaktor für neue Hashes; ältere Hashes werden beim Login umgestellt
+BCRYPT_ROUNDS = int(os.environ.get('DUCKRSS_BCRYPT_ROUNDS', 12))
+
+# Parallele bcrypt-Prüfungen pro Login (bcrypt gibt die GIL frei)
+BCRYPT_WORKERS = int(os.environ.get('DUCKRSS_BCRYPT_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Gleichzeitige Anmeldungen/Registrierungen mit bcrypt-Arbeit pro Prozess;
+# wer länger als BCRYPT_QUEUE_TIMEOUT Sekunden auf einen Platz wartet, wird
+# abgewiesen
+BCRYPT_MAX_LOGINS = int(os.environ.get('DUCKRSS_BCRYPT_MAX_LOGINS', 2 * BCRYPT_WORKERS))
+BCRYPT_QUEUE_TIMEOUT = float(os.environ.get('DUCKRSS_BCRYPT_QUEUE_TIMEOUT', 0.5))
+
+# Threads entstehen erst beim ersten Login, also nach einem fork() der Worker
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+_login_slots = threading.BoundedSemaphore(BCRYPT_MAX_LOGINS)
+
+# Vergleichshash für unbekannte Benutzernamen (beim ersten Bedarf erzeugt)
+_unknown_user_hash = None
+
+LOGIN_BCRYPT_SECONDS = Histogram('duckrss_login_bcrypt_seconds', 'bcrypt-Arbeit pro Anmeldung')
+BCRYPT_CHECKS = Counter('duckrss_bcrypt_checks_total', 'Einzelne bcrypt-Vergleiche')
+
+@contextmanager
+def _bcrypt_slot():
+    """Einen der BCRYPT_MAX_LOGINS Plätze für bcrypt-Arbeit belegen"""
+    if not _login_slots.acquire(timeout=BCRYPT_QUEUE_TIMEOUT):
+        raise RateLimited(1)
+    try:
+        yield
+    finally:
+        _login_slots.release()
+
+def _hash_rounds(password_hash):
+    """Arbeitsfaktor aus einem Hash ($2b$12$...) lesen"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+class _PasswordMatch:
+    """Zustand einer Anmeldung: welche Hashes schon vergeben sind und ob
+    das Ergebnis feststeht
+
+    Jedes eingegebene Passwort wird in einem eigenen Task gegen die noch
+    freien Hashes geprüft. Ein Treffer belegt den Hash, so zählt dasselbe
+    Passwort nicht mehrfach. Sobald genug Treffer vorliegen oder die
+    verbleibenden Passwörter nicht mehr reichen, brechen alle Tasks vor der
+    nächsten Prüfung ab.
+    """
+
+    def __init__(self, stored, passwords, required):
+        self.stored = stored
+        self.remaining = len(passwords)
+        self.required = required
+        self.matches = {}
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def check(self, password):
+        for password_id, password_hash in self.stored:
+            if self.done.is_set():
+                return
+            with self.lock:
+                if password_id in self.matches:
+                    continue
+            BCRYPT_CHECKS.inc()
+            if not Auth.verify_password(password, password_hash):
+                continue
+            with self.lock:
+                # Ein anderer Task kann den Hash inzwischen belegt haben
+                if password_id in self.matches:
+                    continue
+                self.matches[password_id] = (password, password_hash)
+                self.remaining -= 1
+                if len(self.matches) >= self.required:
+                    self.done.set()
+            return
+        with self.lock:
+            self.remaining -= 1
+            if len(self.matches) + self.remaining < self.required:
+                self.done.set()
+
+@instrument
 class Auth:
     @staticmethod
     def hash_password(password):
         """Passwort hashen"""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
     
     @staticmethod
@@ -20,9 +110,69 @@ class Auth:
         """Passwort verifizieren"""
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     
+    @staticmethod
+    def match_passwords(stored, passwords, required):
+        """Passwörter parallel gegen gespeicherte Hashes prüfen
+
+        stored ist eine Liste (id, hash). Liefert {id: (passwort, hash)} der
+        getroffenen Hashes; die Prüfung endet, sobald required Treffer
+        vorliegen oder nicht mehr erreichbar sind. Sind bereits
+        BCRYPT_MAX_LOGINS Prüfungen unterwegs, folgt RateLimited statt
+        einer Warteschlange.
+        """
+        state = _PasswordMatch(stored, passwords, required)
+        if required <= 0 or len(passwords) < required:
+            return state.matches
+        with _bcrypt_slot(), timer(LOGIN_BCRYPT_SECONDS):
+            futures = [_bcrypt_pool.submit(state.check, password) for password in passwords]
+            for future in futures:
+                future.result()
+        return state.matches
+    
+    @staticmethod
+    def hash_passwords(passwords):
+        """Mehrere Passwörter parallel hashen
+        
+        Belegt wie match_passwords einen der BCRYPT_MAX_LOGINS Plätze und
+        löst RateLimited aus, wenn keiner frei wird.
+        """
+        if not passwords:
+            return []
+        with _bcrypt_slot():
+            return list(_bcrypt_pool.map(Auth.hash_password, passwords))
+    
+    @staticmethod
+    def _rehash_passwords(matches):
+        """Treffer mit veraltetem Arbeitsfaktor neu hashen
+        
+        Ohne freien bcrypt-Platz bleibt der alte Hash bis zur nächsten
+        Anmeldung, die Anmeldung selbst ist bereits erfolgreich.
+        """
+        outdated = {password_id: password
+                    for password_id, (password, password_hash) in matches.items()
+                    if _hash_rounds(password_hash) != BCRYPT_ROUNDS}
+        if not outdated:
+            return
+        try:
+            updates = list(zip(Auth.hash_passwords(list(outdated.values())), outdated))
+        except RateLimited:
+            return
+        conn = get_db()
+        try:
+            conn.executemany('UPDATE passwords SET password_hash = ? WHERE id = ?', updates)
+            conn.commit()
+        finally:
+            conn.close()
+    
     @staticmethod
     def create_user(username, passwords=None, required_passwords=1, required_passkeys=0):
-        """Neuen Benutzer erstellen"""
+        """Neuen Benutzer erstellen
+        
+        Gehasht wird vor der Transaktion (RateLimited, wenn kein bcrypt-Platz
+        frei wird), die Datenbank bleibt währenddessen ungesperrt.
+        """
+        password_hashes = Auth.hash_passwords(passwords)
+        
         conn = get_db()
         cursor = conn.cursor()
         
@@ -38,13 +188,11 @@ class Auth:
             ''', (user_id, required_passwords, required_passkeys))
             
             # Passwörter hinzufügen
-            if passwords:
-                for password in passwords:
-                    password_hash = Auth.hash_password(password)
-                    cursor.execute('''
-                        INSERT INTO passwords (user_id, password_hash)
-                        VALUES (?, ?)
-                    ''', (user_id, password_hash))
+            for password_hash in password_hashes:
+                cursor.execute('''
+                    INSERT INTO passwords (user_id, password_hash)
+                    VALUES (?, ?)
+                ''', (user_id, password_hash))
             
             conn.commit()
             return user_id
@@ -66,6 +214,10 @@ class Auth:
         
         if not user:
             conn.close()
+            # Gleiche bcrypt-Arbeit wie bei einem falschen Passwort, damit die
+            # Antwortzeit nicht verrät, ob der Benutzername existiert
+            if passwords:
+                Auth.match_passwords([(0, Auth._get_unknown_user_hash())], passwords, 1)
             return None
         
         user_id = user['id']
@@ -78,47 +230,62 @@ class Auth:
         required_passkeys = requirements['required_passkeys'] if requirements else 0
         
         # Passwörter prüfen
-        if required_passwords > 0 and passwords:
-            cursor.execute('SELECT password_hash FROM passwords WHERE user_id = ?', (user_id,))
-            stored_hashes = [row['password_hash'] for row in cursor.fetchall()]
-            
-            if len(passwords) < required_passwords:
+        matches = {}
+        if required_passwords > 0:
+            if not passwords or len(passwords) < required_passwords:
                 conn.close()
                 return None
             
-            verified_count = 0
-            for password in passwords:
-                for stored_hash in stored_hashes:
-                    if Auth.verify_password(password, stored_hash):
-                        verified_count += 1
-                        break
+            cursor.execute('SELECT id, password_hash FROM passwords WHERE user_id = ?', (user_id,))
+            stored = [(row['id'], row['password_hash']) for row in cursor.fetchall()]
+            conn.close()
             
-            if verified_count < required_passwords:
-                conn.close()
+            matches = Auth.match_passwords(stored, passwords, required_passwords)
+            if len(matches) < required_passwords:
                 return None
+        else:
+            conn.close()
         
         # TODO: Passkeys prüfen (WebAuthn implementierung)
         # Für jetzt: wenn keine Passkeys erforderlich oder nur Passwörter
         
-        conn.close()
+        Auth._rehash_passwords(matches)
         return dict(user)
     
+    @staticmethod
+    def _get_unknown_user_hash():
+        """Hash eines zufälligen Passworts mit aktuellem Arbeitsfaktor"""
+        global _unknown_user_hash
+        if _unknown_user_hash is None:
+            _unknown_user_hash = Auth.hash_password(secrets.token_urlsafe())
+        return _unknown_user_hash
+    
     @staticmethod
     def get_user_by_id(user_id):
-        """Benutzer anhand ID laden"""
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-        user = cursor.fetchone()
-        conn.close()
-        return dict(user) if user else None
+        """Benutzer anhand ID laden (aus user_cache)"""
+        user = user_cache.get(('user', user_id))
+        if user is None:
+            conn = get_db()
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+            user = cursor.fetchone()
+            conn.close()
+            if not user:
+                return None
+            user = dict(user)
+            user_cache.set(('user', user_id), user)
+        return dict(user)
     
     @staticmethod
     def get_security_requirements(user_id):
-        """Sicherheitsanforderungen laden"""
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM security_requirements WHERE user_id = ?', (user_id,))
-        reqs = cursor.fetchone()
-        conn.close()
-        return dict(reqs) if reqs else {'required_passwords': 1, 'required_passkeys': 0}
+        """Sicherheitsanforderungen laden (aus user_cache)"""
+        reqs = user_cache.get(('requirements', user_id))
+        if reqs is None:
+            conn = get_db()
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM security_requirements WHERE user_id = ?', (user_id,))
+            reqs = cursor.fetchone()
+            conn.close()
+            reqs = dict(reqs) if reqs else {'required_passwords': 1, 'required_passkeys': 0}
+            user_cache.set(('requirements', user_id), reqs)
+        return dict(reqs)
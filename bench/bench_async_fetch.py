@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Benchmark: Asynchroner Abruf gegen einen lokalen HTTP-Server
+
+Startet einen lokalen HTTP/1.1-Server (Keep-Alive) mit Fixture-Feeds und
+misst Feeds/Sekunde für den sequenziellen Abruf (RSSManager._download)
+und für AsyncFetcher. Optional verzögert der Server jede Antwort, um
+langsame Upstream-Server nachzubilden. Ein letzter Lauf mit mehr Feeds als
+parallelen Plätzen und knappem Zeitlimit prüft, dass Wartezeit auf eine
+Verbindung nicht zum Zeitlimit zählt. Kein Netzwerkzugriff nötig.
+
+Aufruf: python3 bench/bench_async_fetch.py [Feeds] [Verzögerung in ms]
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_fetcher import AsyncFetcher
+from rss_manager import RSSManager
+
+def make_body(n, entries=50):
+    items = ''.join(
+        f'<item><title>Feed {n} Artikel {i}</title><link>https://example.org/{n}/{i}</link>'
+        f'<guid>https://example.org/{n}/{i}</guid><description>Text {i}</description></item>'
+        for i in range(entries)
+    )
+    return (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f'<title>Feed {n}</title><link>https://example.org/{n}</link>'
+            f'<description>Fixture</description>{items}</channel></rss>').encode('utf-8')
+
+def start_server(bodies, delay):
+    """Fixture-Server im Hintergrund starten, liefert die Basis-URL"""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            n = int(self.path.strip('/').split('.')[0])
+            if delay:
+                time.sleep(delay)
+            body = bodies[n]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rss+xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+async def async_download_all(fetcher, inputs):
+    async with fetcher.session() as session:
+        return await asyncio.gather(*(fetcher.download(session, input_feed) for input_feed in inputs))
+
+def main():
+    feeds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    bodies = [make_body(n) for n in range(feeds)]
+    base_url = start_server(bodies, delay)
+    inputs = [{'id': n, 'feed_url': f'{base_url}/{n}.xml'} for n in range(feeds)]
+    print(f'{feeds} Feeds, {delay * 1000:.0f} ms Serververzögerung')
+
+    started = time.perf_counter()
+    for input_feed in inputs:
+        RSSManager._download(input_feed)
+    elapsed = time.perf_counter() - started
+    print(f'  sequenziell        {feeds / elapsed:8.1f} Feeds/s')
+
+    for concurrency in (10, 50, 100):
+        fetcher = AsyncFetcher(concurrency=concurrency, per_host=concurrency)
+        started = time.perf_counter()
+        responses = asyncio.run(async_download_all(fetcher, inputs))
+        elapsed = time.perf_counter() - started
+        assert all(response['status'] == 200 for response in responses)
+        print(f'  async ({concurrency:3d} parallel) {feeds / elapsed:8.1f} Feeds/s')
+
+    # Mehr Feeds als Plätze bei knappem Zeitlimit: wartende Anfragen dürfen
+    # nicht ablaufen, bevor sie überhaupt eine Verbindung haben
+    concurrency = 2
+    timeout = max(3 * delay, 0.5)
+    queued = inputs[:max(6 * concurrency, 1)]
+    fetcher = AsyncFetcher(concurrency=concurrency, per_host=concurrency, timeout=timeout)
+    started = time.perf_counter()
+    responses = asyncio.run(async_download_all(fetcher, queued))
+    elapsed = time.perf_counter() - started
+    assert all(response['status'] == 200 for response in responses)
+    print(f'  async (Warteschlange: {len(queued)} Feeds, {concurrency} parallel, '
+          f'Zeitlimit {timeout:.2f} s) {elapsed:.2f} s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Benchmark: Item-Übernahme in fetch_feed (Einträge/Sekunde)
+
+Vergleicht das frühere Einfügen Zeile für Zeile (ein INSERT plus ein
+Zuordnungs-INSERT pro Eintrag, Duplikate über die UNIQUE-Verletzung)
+mit RSSManager._store_entries. Letzteres pflegt zusätzlich output_timeline
+und schreibt damit jeden Eintrag einmal pro verknüpftem Ausgang mehr.
+
+Aufruf: python3 bench/bench_ingest.py [Einträge pro Feed] [Wiederholungen]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import get_db, init_db
+from rss_manager import RSSManager, _publication_fields, render_item_xml
+
+def legacy_store_entries(cursor, input_id, entries):
+    """Stand vor der Umstellung: ein Round-Trip pro Eintrag"""
+    new_items = 0
+    for guid, title, link, description, content, author, published, *_ in entries:
+        try:
+            cursor.execute('''
+                INSERT INTO feed_items (input_id, guid, title, link, description, content, author, published)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (input_id, guid, title, link, description, content, author, published))
+            item_id = cursor.lastrowid
+            cursor.execute('''
+                INSERT INTO item_output_mapping (item_id, output_id)
+                SELECT ?, output_id FROM input_output_mapping WHERE input_id = ?
+            ''', (item_id, input_id))
+            new_items += 1
+        except:
+            pass
+    return new_items
+
+def make_entries(prefix, count):
+    """Synthetische, bereits normalisierte Einträge"""
+    body = 'Lorem ipsum dolor sit amet. ' * 40
+    entries = []
+    for i in range(count):
+        fields = (f'{prefix}-{i}', f'Titel {i}', f'https://example.org/{prefix}/{i}', body[:200], body,
+                  'autor@example.org') + _publication_fields(datetime(2024, 1, 1 + i % 28, i % 24, i % 60))
+        item_xml = render_item_xml(dict(zip(('guid', 'title', 'link', 'description', 'content', 'author',
+                                             'published', 'published_ts', 'pub_date'), fields)))
+        entries.append(fields + (item_xml, f'{i:040x}'))
+    return entries
+
+def setup_input(outputs=3):
+    """Benutzer, Eingang und verknüpfte Ausgänge anlegen"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('INSERT INTO users (username) VALUES (?)', (f'bench-{time.time_ns()}',))
+    user_id = cursor.lastrowid
+    cursor.execute('INSERT INTO inputs (user_id, name, feed_url) VALUES (?, ?, ?)', (user_id, 'bench', 'file://bench'))
+    input_id = cursor.lastrowid
+    for n in range(outputs):
+        cursor.execute('INSERT INTO outputs (user_id, name, slug) VALUES (?, ?, ?)',
+                       (user_id, 'bench', f'bench-{input_id}-{n}'))
+        cursor.execute('INSERT INTO input_output_mapping (input_id, output_id) VALUES (?, ?)',
+                       (input_id, cursor.lastrowid))
+    conn.commit()
+    conn.close()
+    return input_id
+
+def run(store, entries):
+    """Einträge in einer Transaktion speichern, Einträge/Sekunde liefern"""
+    input_id = setup_input()
+    conn = get_db()
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    store(cursor, input_id, entries)
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return len(entries) / elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    workdir = tempfile.mkdtemp(prefix='duckrss-bench-')
+    os.chdir(workdir)
+    database.DB_PATH = os.path.join(workdir, 'bench.db')
+    init_db()
+
+    print(f'{count} Einträge pro Feed, {rounds} Wiederholungen')
+    for name, store in (('zeilenweise', legacy_store_entries), ('gebündelt', RSSManager._store_entries)):
+        fresh, repeat = [], []
+        for r in range(rounds):
+            entries = make_entries(f'{name}-{r}', count)
+            fresh.append(run(store, entries))
+            # Zweiter Abruf desselben Feeds: nur Duplikate
+            repeat.append(run(store, entries))
+        print(f'  {name:12s} neu: {max(fresh):10.0f} Einträge/s   unverändert: {max(repeat):10.0f} Einträge/s')
+
+if __name__ == '__main__':
+    main()
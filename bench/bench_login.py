@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Benchmark: Login-Latenz gegen Anzahl der Passwörter
+
+Vergleicht die frühere verschachtelte Schleife (jedes Passwort gegen jeden
+Hash, nacheinander) mit Auth.verify_user (parallele Prüfung, Abbruch sobald
+das Ergebnis feststeht). Gemessen wird jeweils eine erfolgreiche Anmeldung
+mit allen Passwörtern in umgekehrter Reihenfolge und eine Anmeldung, deren
+erstes Passwort falsch ist.
+
+Aufruf: python3 bench/bench_login.py [Passwort-Anzahlen ...]
+        (Arbeitsfaktor über DUCKRSS_BCRYPT_ROUNDS)
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from auth import Auth, BCRYPT_ROUNDS, BCRYPT_WORKERS
+
+def legacy_verify(stored_hashes, passwords, required):
+    """Stand vor der Umstellung: alle Kombinationen nacheinander"""
+    verified_count = 0
+    for password in passwords:
+        for stored_hash in stored_hashes:
+            if Auth.verify_password(password, stored_hash):
+                verified_count += 1
+                break
+    return verified_count >= required
+
+def measure(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started) * 1000
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 2, 5, 10]
+    directory = tempfile.mkdtemp(prefix='duckrss-login-')
+    database.DB_PATH = os.path.join(directory, 'login.db')
+    database.init_db()
+
+    print(f'bcrypt rounds {BCRYPT_ROUNDS}, {BCRYPT_WORKERS} Threads, {os.cpu_count()} Kerne')
+    print(f'{"Passwörter":>10}  {"alt ok ms":>10} {"neu ok ms":>10}  {"alt falsch ms":>14} {"neu falsch ms":>14}')
+    for count in counts:
+        passwords = [f'passwort-{n}' for n in range(count)]
+        username = f'bench-{count}'
+        Auth.create_user(username, passwords, count, 0)
+        conn = database.get_db()
+        stored_hashes = [row['password_hash'] for row in conn.execute(
+            'SELECT password_hash FROM passwords p JOIN users u ON u.id = p.user_id WHERE u.username = ?',
+            (username,))]
+        conn.close()
+
+        correct = passwords[::-1]
+        wrong = ['falsch'] + correct[1:]
+        legacy_ok = measure(legacy_verify, stored_hashes, correct, count)
+        new_ok = measure(Auth.verify_user, username, correct)
+        legacy_wrong = measure(legacy_verify, stored_hashes, wrong, count)
+        new_wrong = measure(Auth.verify_user, username, wrong)
+        print(f'{count:>10}  {legacy_ok:>10.0f} {new_ok:>10.0f}  {legacy_wrong:>14.0f} {new_wrong:>14.0f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Benchmark: Parsen im Prozess-Pool (Durchsatz je Prozessanzahl)
+
+Erzeugt einen Korpus lokaler Fixture-Feeds und parst ihn mit parse_feed
+einmal im aktuellen Prozess und dann in ProcessPoolExecutors mit 1, 2,
+4, ... Prozessen bis zur Anzahl der CPU-Kerne.
+
+Aufruf: python3 bench/bench_parse.py [Feeds] [Einträge pro Feed]
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss_manager import parse_feed
+
+def write_fixtures(directory, feeds, entries):
+    """RSS 2.0 Fixture-Feeds mit Volltext schreiben"""
+    body = '&lt;p&gt;Lorem ipsum dolor sit amet, consectetur adipiscing elit.&lt;/p&gt;' * 20
+    paths = []
+    for n in range(feeds):
+        items = ''.join(
+            f'<item><title>Feed {n} Artikel {i}</title><link>https://example.org/{n}/{i}</link>'
+            f'<guid>https://example.org/{n}/{i}</guid><description>{body[:400]}</description>'
+            f'<content:encoded>{body}</content:encoded>'
+            f'<pubDate>Mon, {1 + i % 28:02d} Jan 2024 10:{i % 60:02d}:00 +0000</pubDate></item>'
+            for i in range(entries)
+        )
+        path = os.path.join(directory, f'feed-{n}.xml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>'
+                    '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+                    f'<channel><title>Feed {n}</title><link>https://example.org/{n}</link>'
+                    f'<description>Fixture</description>{items}</channel></rss>')
+        paths.append(path)
+    return paths
+
+def main():
+    feeds = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    entries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    directory = tempfile.mkdtemp(prefix='duckrss-fixtures-')
+    bodies = []
+    for path in write_fixtures(directory, feeds, entries):
+        with open(path, 'rb') as f:
+            bodies.append(f.read())
+
+    cores = os.cpu_count() or 1
+    print(f'{feeds} Feeds x {entries} Einträge, {sum(map(len, bodies)) / 1024 / 1024:.1f} MB, {cores} Kerne')
+
+    started = time.perf_counter()
+    for body in bodies:
+        parse_feed(body)
+    elapsed = time.perf_counter() - started
+    print(f'  im Prozess      {feeds / elapsed:8.1f} Feeds/s  {feeds * entries / elapsed:9.0f} Einträge/s')
+
+    processes = 1
+    context = multiprocessing.get_context('spawn')
+    while True:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            list(pool.map(parse_feed, bodies[:processes]))  # Prozesse starten
+            started = time.perf_counter()
+            list(pool.map(parse_feed, bodies))
+            elapsed = time.perf_counter() - started
+        print(f'  {processes:2d} Prozess(e)   {feeds / elapsed:8.1f} Feeds/s  {feeds * entries / elapsed:9.0f} Einträge/s')
+        if processes >= cores:
+            break
+        processes = min(processes * 2, cores)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Benchmark: RSS-Serialisierung (Zeit und Spitzen-Speicher)
+
+Vergleicht die frühere Serialisierung (ElementTree -> String ->
+minidom -> toprettyxml) mit dem streamenden RSSManager._iter_rss_xml,
+einmal mit Serialisierung jedes Items und einmal mit beim Speichern
+vorgerenderten Fragmenten (feed_items.item_xml).
+
+Aufruf: python3 bench/bench_render.py [Item-Anzahlen ...]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from xml.dom import minidom
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss_manager import RSSManager, render_item_xml
+
+def legacy_generate_rss_xml(output, items):
+    """Stand vor der Umstellung: Baum, String, minidom, toprettyxml"""
+    ET.register_namespace('content', 'http://purl.org/rss/1.0/modules/content/')
+    rss = ET.Element('rss', {'version': '2.0'})
+    channel = ET.SubElement(rss, 'channel')
+    ET.SubElement(channel, 'title').text = output['name']
+    ET.SubElement(channel, 'description').text = output.get('description') or ''
+    ET.SubElement(channel, 'link').text = f"http://localhost:5000/exit/{output['slug']}.xml"
+    ET.SubElement(channel, 'lastBuildDate').text = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0000')
+    ET.SubElement(channel, 'generator').text = 'DuckRSS'
+    for item in items:
+        item_elem = ET.SubElement(channel, 'item')
+        ET.SubElement(item_elem, 'title').text = item['title'] or 'Kein Titel'
+        if item.get('link'):
+            ET.SubElement(item_elem, 'link').text = item['link']
+        ET.SubElement(item_elem, 'description').text = item.get('description') or ''
+        if item.get('content'):
+            ET.SubElement(item_elem, '{http://purl.org/rss/1.0/modules/content/}encoded').text = item['content']
+        if item.get('author'):
+            ET.SubElement(item_elem, 'author').text = item['author']
+        ET.SubElement(item_elem, 'guid').text = item['guid']
+        if item.get('published'):
+            pub_date = datetime.fromisoformat(item['published'])
+            ET.SubElement(item_elem, 'pubDate').text = pub_date.strftime('%a, %d %b %Y %H:%M:%S +0000')
+    xml_str = ET.tostring(rss, encoding='unicode')
+    return minidom.parseString(xml_str).toprettyxml(indent='  ', encoding='utf-8')
+
+def streaming_generate_rss_xml(output, items):
+    """Neuer Weg: Chunks wie beim Streamen an den Client verbrauchen"""
+    size = 0
+    for chunk in RSSManager._iter_rss_xml(output, items):
+        size += len(chunk)
+    return size
+
+def make_items(count):
+    """Items mit Volltext-Inhalt (ca. 4 KB content:encoded)"""
+    body = '<p>Lorem ipsum dolor sit amet, consectetur &amp; adipiscing elit.</p>' * 60
+    return [{
+        'title': f'Artikel {i}', 'link': f'https://example.org/artikel/{i}',
+        'description': body[:300], 'content': body, 'author': 'redaktion@example.org',
+        'guid': f'https://example.org/artikel/{i}', 'published': f'2024-01-{1 + i % 28:02d} 10:00:00',
+        'pub_date': f'Mon, {1 + i % 28:02d} Jan 2024 10:00:00 +0000',
+    } for i in range(count)]
+
+def measure(render, output, items):
+    """Laufzeit (ms) und zusätzlicher Spitzen-Speicher (MB)"""
+    started = time.perf_counter()
+    render(output, items)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    render(output, items)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [50, 500, 5000]
+    output = {'name': 'Benchmark', 'description': 'Benchmark-Feed', 'slug': 'benchmark'}
+
+    print(f'{"Items":>6}  {"minidom ms":>11} {"MB":>8}  {"Streaming ms":>13} {"MB":>8}  {"Fragmente ms":>13} {"MB":>8}')
+    for count in counts:
+        items = make_items(count)
+        rendered = [{'item_xml': render_item_xml(item)} for item in items]
+        legacy_ms, legacy_mb = measure(legacy_generate_rss_xml, output, items)
+        stream_ms, stream_mb = measure(streaming_generate_rss_xml, output, items)
+        fragment_ms, fragment_mb = measure(streaming_generate_rss_xml, output, rendered)
+        print(f'{count:>6}  {legacy_ms:>11.1f} {legacy_mb:>8.1f}  {stream_ms:>13.1f} {stream_mb:>8.2f}'
+              f'  {fragment_ms:>13.2f} {fragment_mb:>8.2f}')
+
+if __name__ == '__main__':
+    main()
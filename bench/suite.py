@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Benchmark-Suite der häufigen Pfade (JSON-Ausgabe)
+
+Misst auf einer synthetischen Datenbank (siehe synthetic_db.py):
+- get_output_feed: Rendern ohne Cache und aus dem Cache
+- get_all_items: erste Seite von /feeds
+- fetch_feed: Übernahme neuer und unveränderter Fixture-Feeds über einen
+  lokalen HTTP-Server (kein Netzwerkzugriff nötig)
+- Auth.verify_user: erfolgreiche und fehlgeschlagene Anmeldung
+
+Das Ergebnis ist JSON (Laufzeiten in ms mit mean/p50/p95/min/max plus
+Umgebung und Commit), damit Releases miteinander verglichen werden können.
+
+Aufruf: python3 bench/suite.py [--db DATEI] [--users N] [--items N] ...
+        [--output ergebnis.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import database
+from auth import Auth
+from database import get_db
+from rss_manager import RSSManager, feed_cache
+from bench_async_fetch import start_server
+from bench_parse import write_fixtures
+from synthetic_db import BENCH_PASSWORD, generate
+
+def summarize(samples):
+    """Laufzeiten (Sekunden) als Kennzahlen in Millisekunden"""
+    ms = sorted(sample * 1000 for sample in samples)
+    return {
+        'n': len(ms),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'p50_ms': round(ms[len(ms) // 2], 3),
+        'p95_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        'min_ms': round(ms[0], 3),
+        'max_ms': round(ms[-1], 3),
+    }
+
+def timed(func, args_list):
+    """func für jedes Argument einmal aufrufen, Laufzeiten sammeln"""
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def bench_output_feed(slugs):
+    def cold(slug):
+        feed_cache.clear()
+        RSSManager.get_output_feed(slug)
+
+    results = {'get_output_feed_cold': summarize(timed(cold, [(slug,) for slug in slugs]))}
+    for slug in slugs:
+        RSSManager.get_output_feed(slug)
+    results['get_output_feed_cached'] = summarize(timed(RSSManager.get_output_feed, [(slug,) for slug in slugs]))
+    return results
+
+def bench_all_items(user_ids):
+    return {'get_all_items': summarize(timed(RSSManager.get_all_items, [(user_id,) for user_id in user_ids]))}
+
+def bench_fetch(feeds, entries):
+    """Fixture-Feeds zweimal abrufen: erst alles neu, dann unverändert"""
+    fixtures = tempfile.mkdtemp(prefix='duckrss-fixtures-')
+    bodies = []
+    for path in write_fixtures(fixtures, feeds, entries):
+        with open(path, 'rb') as f:
+            bodies.append(f.read())
+    base_url = start_server(bodies, 0)
+
+    user_id = Auth.create_user(f'bench-fetch-{time.time_ns()}', [], 0, 0)
+    output_id, _ = RSSManager.create_output(user_id, f'bench-fetch-{user_id}')
+    input_ids = []
+    for n in range(feeds):
+        input_id = RSSManager.create_input(user_id, f'Fixture {n}', f'{base_url}/{n}.xml')
+        RSSManager.link_input_to_output(input_id, output_id)
+        input_ids.append(input_id)
+
+    args = [(input_id,) for input_id in input_ids]
+    new = timed(RSSManager.fetch_feed, args)
+    unchanged = timed(RSSManager.fetch_feed, args)
+    return {
+        'fetch_feed_new': dict(summarize(new), items_per_second=round(feeds * entries / sum(new), 1)),
+        'fetch_feed_unchanged': summarize(unchanged),
+    }
+
+def bench_login(logins):
+    username = f'bench-login-{time.time_ns()}'
+    Auth.create_user(username, [BENCH_PASSWORD], 1, 0)
+    return {
+        'verify_user': summarize(timed(Auth.verify_user, [(username, [BENCH_PASSWORD])] * logins)),
+        'verify_user_wrong_password': summarize(timed(Auth.verify_user, [(username, ['falsch'])] * logins)),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='DuckRSS Benchmark-Suite')
+    parser.add_argument('--db', help='Vorhandene synthetische Datenbank (sonst wird eine erzeugt)')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--inputs', type=int, default=10, help='Eingänge pro Benutzer')
+    parser.add_argument('--outputs', type=int, default=3, help='Ausgänge pro Benutzer')
+    parser.add_argument('--items', type=int, default=500, help='Items pro Eingang')
+    parser.add_argument('--samples', type=int, default=50, help='Messungen pro Feed-/Item-Benchmark')
+    parser.add_argument('--fetch-feeds', type=int, default=20, help='Fixture-Feeds für fetch_feed')
+    parser.add_argument('--fetch-entries', type=int, default=100, help='Einträge pro Fixture-Feed')
+    parser.add_argument('--logins', type=int, default=5, help='Anmeldungen für verify_user')
+    parser.add_argument('--output', help='JSON in diese Datei schreiben (Standard: stdout)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='duckrss-suite-')
+    os.chdir(workdir)
+    generation = None
+    if args.db:
+        path = os.path.abspath(args.db)
+        database.DB_PATH = path
+        if not os.path.exists(path):
+            started = time.perf_counter()
+            generate(path, args.users, args.inputs, args.outputs, args.items)
+            generation = time.perf_counter() - started
+        database.init_db()
+    else:
+        path = os.path.join(workdir, 'bench.db')
+        started = time.perf_counter()
+        generate(path, args.users, args.inputs, args.outputs, args.items)
+        generation = time.perf_counter() - started
+
+    conn = get_db()
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('users', 'inputs', 'outputs', 'feed_items', 'item_output_mapping')}
+    slugs = [row[0] for row in conn.execute('SELECT slug FROM outputs')]
+    user_ids = [row[0] for row in conn.execute('SELECT id FROM users')]
+    conn.close()
+
+    rng = random.Random(42)
+    results = {}
+    results.update(bench_output_feed([rng.choice(slugs) for _ in range(args.samples)]))
+    results.update(bench_all_items([rng.choice(user_ids) for _ in range(args.samples)]))
+    results.update(bench_fetch(args.fetch_feeds, args.fetch_entries))
+    results.update(bench_login(args.logins))
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'database': {
+            'path': path,
+            'size_bytes': os.path.getsize(path),
+            'generation_seconds': round(generation, 1) if generation is not None else None,
+            'rows': counts,
+        },
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Synthetische Datenbank für Benchmarks
+
+Legt über das echte Schema (init_db inkl. Migrationen) Benutzer, Eingänge,
+Ausgänge, Items, Zuordnungen und die Timeline an. Alle Benutzer teilen sich
+einen Passwort-Hash, damit das Anlegen nicht an bcrypt hängt.
+
+Aufruf: python3 bench/synthetic_db.py ZIEL.db [--users N] [--inputs N]
+        [--outputs N] [--items N] [--custom N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from auth import Auth
+from database import get_db, init_db
+from rss_manager import RSSManager, _publication_fields, render_item_xml
+
+BENCH_PASSWORD = 'benchmark'
+
+def generate(path, users=20, inputs=10, outputs=3, items=500, custom=5):
+    """Datenbank unter path erzeugen, liefert die Anzahl der Zeilen pro Tabelle
+
+    Jeder Eingang ist mit bis zu zwei Ausgängen seines Benutzers verknüpft,
+    jedes Item erscheint damit in ein bis zwei Ausgängen.
+    """
+    database.DB_PATH = path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    init_db()
+
+    password_hash = Auth.hash_password(BENCH_PASSWORD)
+    body = '<p>Lorem ipsum dolor sit amet, consectetur &amp; adipiscing elit.</p>' * 20
+    start = datetime(2024, 1, 1)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    for u in range(users):
+        cursor.execute('INSERT INTO users (username) VALUES (?)', (f'user{u}',))
+        user_id = cursor.lastrowid
+        cursor.execute('INSERT INTO security_requirements (user_id, required_passwords, required_passkeys) VALUES (?, 1, 0)',
+                       (user_id,))
+        cursor.execute('INSERT INTO passwords (user_id, password_hash) VALUES (?, ?)', (user_id, password_hash))
+
+        output_ids = []
+        for o in range(outputs):
+            cursor.execute('INSERT INTO outputs (user_id, name, slug, description) VALUES (?, ?, ?, ?)',
+                           (user_id, f'Ausgang {u}-{o}', f'user{u}-out{o}', 'Synthetischer Ausgang'))
+            output_ids.append(cursor.lastrowid)
+
+        for i in range(inputs):
+            cursor.execute('INSERT INTO inputs (user_id, name, feed_url) VALUES (?, ?, ?)',
+                           (user_id, f'Eingang {u}-{i}', f'https://example.org/{u}/{i}.xml'))
+            input_id = cursor.lastrowid
+            for output_id in {output_ids[i % outputs], output_ids[(i + 1) % outputs]} if outputs else ():
+                cursor.execute('INSERT INTO input_output_mapping (input_id, output_id) VALUES (?, ?)',
+                               (input_id, output_id))
+
+            rows = []
+            for n in range(items):
+                guid = f'https://example.org/{u}/{i}/{n}'
+                fields = (guid, f'Artikel {n} aus Eingang {u}-{i}', guid, body[:300], body, 'redaktion@example.org')
+                fields += _publication_fields(start + timedelta(minutes=17 * n + i))
+                item_xml = render_item_xml(dict(zip(
+                    ('guid', 'title', 'link', 'description', 'content', 'author', 'published', 'published_ts', 'pub_date'),
+                    fields)))
+                rows.append((input_id,) + fields + (item_xml,))
+            cursor.executemany('''
+                INSERT INTO feed_items
+                    (input_id, guid, title, link, description, content, author,
+                     published, published_ts, pub_date, item_xml)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+        for n in range(custom):
+            guid = f'custom-{u}-{n}'
+            fields = _publication_fields(start + timedelta(hours=n))
+            item_xml = render_item_xml({'guid': guid, 'title': f'Eigener Artikel {n}', 'description': body[:200],
+                                        'content': body, 'pub_date': fields[2]})
+            cursor.execute('''
+                INSERT INTO feed_items
+                    (user_id, guid, title, content, description, is_custom, published, published_ts, pub_date, item_xml)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
+            ''', (user_id, guid, f'Eigener Artikel {n}', body, body[:200]) + fields + (item_xml,))
+            if output_ids:
+                cursor.execute('INSERT INTO item_output_mapping (item_id, output_id) VALUES (?, ?)',
+                               (cursor.lastrowid, output_ids[n % outputs]))
+        conn.commit()
+
+    # Verteilung auf die Ausgänge wie beim Abruf (FAN_OUT_SQL für alle Eingänge)
+    cursor.execute('''
+        INSERT OR IGNORE INTO item_output_mapping (item_id, output_id)
+        SELECT fi.id, iom.output_id
+        FROM feed_items fi
+        JOIN input_output_mapping iom ON iom.input_id = fi.input_id
+    ''')
+    conn.commit()
+    conn.close()
+    RSSManager.rebuild_timeline()
+
+    conn = get_db()
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('users', 'inputs', 'outputs', 'feed_items', 'item_output_mapping', 'output_timeline')}
+    conn.execute('PRAGMA optimize')
+    conn.close()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetische DuckRSS-Datenbank erzeugen')
+    parser.add_argument('path', help='Ziel-Datei (darf noch nicht existieren)')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--inputs', type=int, default=10, help='Eingänge pro Benutzer')
+    parser.add_argument('--outputs', type=int, default=3, help='Ausgänge pro Benutzer')
+    parser.add_argument('--items', type=int, default=500, help='Items pro Eingang')
+    parser.add_argument('--custom', type=int, default=5, help='Eigene Artikel pro Benutzer')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f'{args.path} existiert bereits')
+    started = time.perf_counter()
+    counts = generate(args.path, args.users, args.inputs, args.outputs, args.items, args.custom)
+    print(', '.join(f'{table}: {count}' for table, count in counts.items()))
+    print(f'✓ {args.path} in {time.perf_counter() - started:.1f}s erzeugt')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - In-Memory Cache
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Begrenzter, thread-sicherer LRU-Cache mit optionaler Lebensdauer
+
+    maxsize: maximale Anzahl Einträge, älteste werden zuerst verdrängt
+    ttl: maximales Alter eines Eintrags in Sekunden (None = unbegrenzt)
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Eintrag holen und als zuletzt benutzt markieren"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Eintrag speichern, bei Überlauf den ältesten verdrängen"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        """Einzelnen Eintrag entfernen"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else None
+
+    def discard_where(self, predicate):
+        """Alle Einträge entfernen, deren Wert predicate erfüllt"""
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        """Cache leeren"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+# Metadaten pro Benutzer: ('user'|'requirements'|'inputs'|'outputs', user_id) -> Wert
+# Schreibzugriffe in diesem Prozess invalidieren sofort, die TTL begrenzt die
+# Verzögerung für Änderungen aus anderen Prozessen (z.B. last_fetch vom Scheduler).
+USER_CACHE_SIZE = int(os.environ.get('DUCKRSS_USER_CACHE_SIZE', 1024))
+USER_CACHE_TTL = int(os.environ.get('DUCKRSS_USER_CACHE_TTL', 60))
+user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def invalidate_user(user_id, *kinds):
+    """Gecachte Metadaten eines Benutzers verwerfen (ohne kinds: alle)"""
+    for kind in kinds or ('user', 'requirements', 'inputs', 'outputs'):
+        user_cache.pop((kind, user_id))
@@ -7,15 +7,113 @@ DuckRSS - Datenbank Verwaltung
 import sqlite3
 import os
 import json
-from datetime import datetime
+import queue
+import threading
+from datetime import datetime, timezone
+from feed_xml import render_item_xml
 
 DB_PATH = 'data/duckrss.db'
 
+# Anzahl offen gehaltener Verbindungen pro Prozess
+DB_POOL_SIZE = int(os.environ.get('DUCKRSS_DB_POOL_SIZE', 8))
+
+# PRAGMAs für jede neue Verbindung, einzeln überschreibbar per
+# DUCKRSS_DB_<NAME> (z.B. DUCKRSS_DB_CACHE_SIZE=-64000)
+DB_PRAGMAS = {
+    name: os.environ.get(f'DUCKRSS_DB_{name.upper()}', default)
+    for name, default in (
+        # muss vor journal_mode stehen, wirkt nur auf neue, leere Dateien
+        ('auto_vacuum', 'INCREMENTAL'), # freie Seiten per compact zurückgeben
+        ('journal_mode', 'WAL'),        # Leser blockieren den Abruf nicht
+        ('synchronous', 'NORMAL'),      # mit WAL sicher und deutlich schneller
+        ('cache_size', '-16000'),       # 16 MB Page-Cache pro Verbindung
+        ('mmap_size', '134217728'),     # 128 MB memory-mapped I/O
+        ('busy_timeout', '5000'),       # ms warten statt "database is locked"
+        ('temp_store', 'MEMORY'),
+    )
+}
+
+class PooledConnection:
+    """Verbindung aus dem Pool, close() gibt sie an den Pool zurück"""
+    
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+    
+    def close(self):
+        """Offene Transaktion verwerfen und Verbindung zurückgeben"""
+        if self._pool is not None:
+            self._pool.release(self._conn)
+            self._pool = None
+
+class ConnectionPool:
+    """Thread-sicherer Pool von SQLite-Verbindungen für einen Prozess"""
+    
+    def __init__(self, path, size=DB_POOL_SIZE, pragmas=None):
+        self.path = path
+        self.pid = os.getpid()
+        self.pragmas = DB_PRAGMAS if pragmas is None else pragmas
+        self._idle = queue.LifoQueue(maxsize=size)
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+    
+    def acquire(self):
+        """Freie Verbindung holen oder neue öffnen"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        return PooledConnection(conn, self)
+    
+    def release(self, conn):
+        """Verbindung zurücklegen, bei vollem Pool schließen"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+    
+    def close_all(self):
+        """Alle freien Verbindungen schließen"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Pool des aktuellen Prozesses (nach fork oder geändertem DB_PATH neu)"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.path != DB_PATH or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_PATH or _pool.pid != os.getpid():
+                _pool = ConnectionPool(DB_PATH)
+            pool = _pool
+    return pool
+
 def get_db():
-    """Datenbankverbindung herstellen"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Datenbankverbindung aus dem Pool holen"""
+    return get_pool().acquire()
 
 def init_db():
     """Datenbank initialisieren"""
@@ -142,9 +240,195 @@ def init_db():
     ''')
     
     conn.commit()
+    
+    migrate_db(conn)
     conn.close()
     
     print("✓ Datenbank initialisiert:", DB_PATH)
 
+# ============== Migrationen ==============
+
+def _add_column(cursor, table, column, definition):
+    """Spalte hinzufügen, falls sie noch nicht existiert"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row['name'] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _migration_1(cursor):
+    """Abrufintervall und Fehlerzähler für den Scheduler"""
+    _add_column(cursor, 'inputs', 'fetch_interval', 'INTEGER DEFAULT 1800')
+    _add_column(cursor, 'inputs', 'fetch_errors', 'INTEGER DEFAULT 0')
+
+def _migration_2(cursor):
+    """HTTP-Validatoren der Upstream-Feeds für bedingte Abrufe"""
+    _add_column(cursor, 'inputs', 'etag', 'TEXT')
+    _add_column(cursor, 'inputs', 'last_modified', 'TEXT')
+
+def _migration_3(cursor):
+    """Indizes für Feed-Ausgabe, Benutzerlisten und Item-Übernahme"""
+    # Items eines Ausgangs; deckt auch die Validatoren (COUNT/MAX) ab
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_item_output_mapping_output
+        ON item_output_mapping (output_id, item_id, added_at)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_inputs_user ON inputs (user_id, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_outputs_user ON outputs (user_id, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_items_input ON feed_items (input_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_items_user ON feed_items (user_id)')
+
+def _migration_4(cursor):
+    """Konfigurierbare Anzahl Items pro öffentlichem Feed"""
+    _add_column(cursor, 'outputs', 'item_limit', 'INTEGER DEFAULT 50')
+
+def _migration_5(cursor):
+    """Inhalts-Hashes zur Erkennung unveränderter Feeds und geänderter Items"""
+    _add_column(cursor, 'inputs', 'content_hash', 'TEXT')
+    _add_column(cursor, 'feed_items', 'content_hash', 'TEXT')
+    # Revision steigt, wenn Items eines Ausgangs an Ort und Stelle geändert werden
+    _add_column(cursor, 'outputs', 'revision', 'INTEGER DEFAULT 0')
+    _add_column(cursor, 'outputs', 'updated_at', 'TIMESTAMP')
+
+def _migration_6(cursor):
+    """Abrufstatistik und nächster Abrufzeitpunkt für adaptive Intervalle"""
+    _add_column(cursor, 'inputs', 'next_fetch_at', 'INTEGER')       # Unix-Zeit (UTC)
+    _add_column(cursor, 'inputs', 'avg_new_items', 'REAL')          # neue Items pro Abruf
+    _add_column(cursor, 'inputs', 'publish_interval', 'INTEGER')    # Sekunden zwischen Artikeln
+    _add_column(cursor, 'inputs', 'upstream_ttl', 'INTEGER')        # ttl/sy/max-age in Sekunden
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_inputs_due
+        ON inputs (active, COALESCE(next_fetch_at, 0))
+    ''')
+    # Bestehende Eingänge im bisherigen Rhythmus weiter abrufen
+    cursor.execute('''
+        UPDATE inputs
+        SET next_fetch_at = CAST(strftime('%s', last_fetch) AS INTEGER) + COALESCE(fetch_interval, 1800)
+        WHERE last_fetch IS NOT NULL AND next_fetch_at IS NULL
+    ''')
+
+def _migration_7(cursor):
+    """Früher erste Fassung von output_timeline, jetzt in _migration_10
+    
+    Die Timeline wird nur noch einmal in ihrer endgültigen Form angelegt und
+    befüllt; die Nummer bleibt belegt, damit die Schema-Version bestehender
+    Datenbanken gültig bleibt.
+    """
+
+def _migration_8(cursor):
+    """Aufbewahrung pro Eingang (NULL = Standard aus retention.py)"""
+    _add_column(cursor, 'inputs', 'retention_days', 'INTEGER')
+    _add_column(cursor, 'inputs', 'retention_count', 'INTEGER')
+
+def _migration_9(cursor):
+    """Veröffentlichungsdatum als UTC-Epoche (Sortierung) und RFC 822 (Ausgabe)"""
+    _add_column(cursor, 'feed_items', 'published_ts', 'INTEGER')
+    _add_column(cursor, 'feed_items', 'pub_date', 'TEXT')
+    
+    # published liegt als UTC-Text 'YYYY-MM-DD HH:MM:SS' vor
+    cursor.execute('SELECT id, published FROM feed_items WHERE published IS NOT NULL AND published_ts IS NULL')
+    updates = []
+    for row in cursor.fetchall():
+        try:
+            published = datetime.fromisoformat(str(row['published'])).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        updates.append((int(published.timestamp()), published.strftime('%a, %d %b %Y %H:%M:%S +0000'), row['id']))
+    cursor.executemany('UPDATE feed_items SET published_ts = ?, pub_date = ? WHERE id = ?', updates)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_items_input_published ON feed_items (input_id, published_ts)')
+
+def _migration_10(cursor):
+    """Vorgerenderte <item>-Fragmente und materialisierte Timeline pro Ausgang
+    
+    Denormalisierte Kopie von item_output_mapping + feed_items mit
+    Primärschlüssel (output_id, Sortierschlüssel): ein Feed ist ein einziger
+    Bereichs-Scan ohne Join und Sortierung. Bewusst keine WITHOUT ROWID-
+    Tabelle: bei Zeilen mit vollem Inhalt schreibt die etwa dreimal langsamer
+    und liest kaum schneller. Gepflegt von RSSManager, neu aufbauen mit
+    `python3 -m rss_manager rebuild-timeline`.
+    
+    Datenbanken aus den Versionen 7 bis 9 haben eine ältere Fassung der
+    Timeline, die hier ersetzt wird.
+    """
+    _add_column(cursor, 'feed_items', 'item_xml', 'BLOB')
+    
+    cursor.execute('''
+        SELECT id, guid, title, link, description, content, author, pub_date
+        FROM feed_items WHERE item_xml IS NULL
+    ''')
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            break
+        cursor.connection.executemany('UPDATE feed_items SET item_xml = ? WHERE id = ?',
+                                      [(render_item_xml(dict(row)), row['id']) for row in rows])
+    
+    cursor.execute('DROP TABLE IF EXISTS output_timeline')
+    cursor.execute('''
+        CREATE TABLE output_timeline (
+            output_id INTEGER NOT NULL,
+            published_ts INTEGER NOT NULL,  -- COALESCE(published_ts, 0)
+            created_at TIMESTAMP NOT NULL,
+            item_id INTEGER NOT NULL,
+            item_xml BLOB NOT NULL,
+            PRIMARY KEY (output_id, published_ts, created_at, item_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_output_timeline_item ON output_timeline (item_id)')
+    cursor.execute('''
+        INSERT OR REPLACE INTO output_timeline (output_id, published_ts, created_at, item_id, item_xml)
+        SELECT iom.output_id, COALESCE(fi.published_ts, 0), fi.created_at, fi.id, fi.item_xml
+        FROM item_output_mapping iom
+        JOIN feed_items fi ON fi.id = iom.item_id
+    ''')
+
+def _migration_11(cursor):
+    """Token-Buckets der Anmeldebegrenzung (ratelimit.SQLiteTokenBucket)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL  -- Unix-Zeit
+        )
+    ''')
+
+def _migration_12(cursor):
+    """Indizes in der Sortierreihenfolge von /feeds (rss_manager.ITEM_ORDER)"""
+    # Pro Eingang bzw. für eigene Items eines Benutzers liefert der Index die
+    # Items bereits sortiert, LIMIT bricht nach einer Seite ab
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_feed_items_input_order
+        ON feed_items (input_id, COALESCE(published_ts, 0), created_at, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_feed_items_user_order
+        ON feed_items (user_id, COALESCE(published_ts, 0), created_at, id)
+    ''')
+
+# Reihenfolge = Schema-Version (PRAGMA user_version)
+MIGRATIONS = [
+    _migration_1,
+    _migration_2,
+    _migration_3,
+    _migration_4,
+    _migration_5,
+    _migration_6,
+    _migration_7,
+    _migration_8,
+    _migration_9,
+    _migration_10,
+    _migration_11,
+    _migration_12,
+]
+
+def migrate_db(conn):
+    """Ausstehende Migrationen anwenden"""
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA user_version')
+    version = cursor.fetchone()[0]
+    
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(cursor)
+        cursor.execute(f'PRAGMA user_version = {number}')
+        conn.commit()
+
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - RSS-XML-Bausteine
+
+Ohne Abhängigkeiten, damit auch database.py (Migrationen) Items rendern
+kann, ohne rss_manager mit feedparser und requests zu laden.
+"""
+
+import re
+from xml.sax.saxutils import escape
+
+CONTENT_NS = 'http://purl.org/rss/1.0/modules/content/'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+# Steuerzeichen, die in XML 1.0 nicht vorkommen dürfen
+_XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+def _xml_text(value):
+    """Text für XML escapen und in XML 1.0 unzulässige Zeichen entfernen"""
+    return escape(_XML_INVALID_CHARS.sub('', str(value)))
+
+def _xml_attr(value):
+    """Wie _xml_text, zusätzlich für Attributwerte in doppelten Anführungszeichen"""
+    return escape(_XML_INVALID_CHARS.sub('', str(value)), {'"': '&quot;'})
+
+def render_item_xml(item):
+    """<item>-Block eines Items als UTF-8 Bytes
+    
+    Wird beim Speichern einmal erzeugt (feed_items.item_xml) und in jedem
+    Ausgang unverändert wiederverwendet.
+    """
+    # Title ist required
+    parts = ['    <item>\n', f'      <title>{_xml_text(item["title"] or "Kein Titel")}</title>\n']
+    
+    # Link ist optional
+    if item.get('link'):
+        parts.append(f'      <link>{_xml_text(item["link"])}</link>\n')
+    
+    # Description - sicherstellen dass es nicht None ist
+    parts.append(f'      <description>{_xml_text(item.get("description") or "")}</description>\n')
+    
+    if item.get('content'):
+        parts.append(f'      <content:encoded>{_xml_text(item["content"])}</content:encoded>\n')
+    
+    # Author ist optional
+    if item.get('author'):
+        parts.append(f'      <author>{_xml_text(item["author"])}</author>\n')
+    
+    # GUID ist required
+    parts.append(f'      <guid>{_xml_text(item["guid"])}</guid>\n')
+    
+    # PubDate ist optional, beim Speichern bereits formatiert
+    if item.get('pub_date'):
+        parts.append(f'      <pubDate>{item["pub_date"]}</pubDate>\n')
+    
+    parts.append('    </item>\n')
+    return ''.join(parts).encode('utf-8')
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - gunicorn-Konfiguration
+
+Aufruf: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+bind = os.environ.get('DUCKRSS_BIND', '0.0.0.0:5000')
+
+# Prozesse nutzen alle Kerne (bcrypt, Rendern), Threads überbrücken
+# wartende Anfragen (SQLite, manueller Abruf eines Eingangs)
+workers = int(os.environ.get('DUCKRSS_WORKERS', min(2 * (os.cpu_count() or 1) + 1, 8)))
+threads = int(os.environ.get('DUCKRSS_THREADS', 4))
+worker_class = 'gthread'
+
+# Länger als DUCKRSS_FETCH_TIMEOUT, damit "Aktualisieren" nicht abgebrochen wird
+timeout = int(os.environ.get('DUCKRSS_WORKER_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Worker regelmäßig ersetzen, begrenzt Speicherwachstum
+max_requests = int(os.environ.get('DUCKRSS_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('DUCKRSS_ACCESS_LOG') or None
+errorlog = '-'
+
+def on_starting(server):
+    """Einmal im Master vor dem Start der Worker: Schema und Secret Key"""
+    from database import get_pool, init_db
+    from app import load_secret_key
+    init_db()
+    load_secret_key()
+    # Keine offenen SQLite-Verbindungen an die geforkten Worker vererben
+    get_pool().close_all()
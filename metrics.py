@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Metriken im Prometheus-Textformat
+
+Zähler und Histogramme leben im Speicher des Prozesses. Ohne
+DUCKRSS_METRICS=1 sind inc()/observe() sofort zurück, timer() ist ein
+leerer Kontextmanager und timed()/instrument() lassen die Funktionen
+unverändert.
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+METRICS_ENABLED = os.environ.get('DUCKRSS_METRICS', '0') == '1'
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Monoton steigender Zähler, optional mit Labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_format_labels(self.labels, key)} {value}'
+
+class Histogram:
+    """Verteilung von Messwerten (meist Sekunden) in festen Buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, '') for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Buckets (nicht kumuliert), +Inf, Summe
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, key)} {counts[-1]}'
+            yield f'{self.name}_count{_format_labels(self.labels, key)} {cumulative}'
+
+class _Timer:
+    """Kontextmanager: Dauer des Blocks in ein Histogramm eintragen"""
+
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+_NULL_TIMER = nullcontext()
+
+def timer(histogram, **labels):
+    """with timer(HISTOGRAM, method='x'): ..."""
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _Timer(histogram, labels)
+
+def timed(histogram, **labels):
+    """Decorator: Laufzeit jedes Aufrufs messen (abgeschaltet: Funktion unverändert)"""
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(histogram, labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+METHOD_SECONDS = Histogram('duckrss_method_seconds',
+                           'Laufzeit der RSSManager-/Auth-Methoden (überwiegend SQLite)', ('method',))
+
+def instrument(cls):
+    """Alle öffentlichen statischen Methoden einer Klasse mit METHOD_SECONDS messen"""
+    if not METRICS_ENABLED:
+        return cls
+    for name, member in list(vars(cls).items()):
+        if isinstance(member, staticmethod) and not name.startswith('_'):
+            wrapped = timed(METHOD_SECONDS, method=f'{cls.__name__}.{name}')(member.__func__)
+            setattr(cls, name, staticmethod(wrapped))
+    return cls
+
+def render():
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)"""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Begrenzung der Anmeldeversuche (Token-Bucket)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from database import get_db
+
+# Versuche pro Benutzername und pro Client-IP: Vorrat (Burst) und Nachschub pro Minute
+LOGIN_USER_BURST = int(os.environ.get('DUCKRSS_LOGIN_USER_BURST', 5))
+LOGIN_USER_PER_MINUTE = float(os.environ.get('DUCKRSS_LOGIN_USER_PER_MINUTE', 5))
+LOGIN_IP_BURST = int(os.environ.get('DUCKRSS_LOGIN_IP_BURST', 20))
+LOGIN_IP_PER_MINUTE = float(os.environ.get('DUCKRSS_LOGIN_IP_PER_MINUTE', 20))
+
+# 'memory' (pro Prozess) oder 'sqlite' (gemeinsam für alle Worker-Prozesse)
+LOGIN_LIMIT_BACKEND = os.environ.get('DUCKRSS_LOGIN_LIMIT_BACKEND', 'memory')
+
+# Höchstzahl gemerkter Schlüssel im Speicher; verdrängte beginnen wieder voll
+RATE_LIMIT_KEYS = int(os.environ.get('DUCKRSS_RATE_LIMIT_KEYS', 10000))
+
+class RateLimited(Exception):
+    """Anfrage abgelehnt, retry_after in ganzen Sekunden"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Zu viele Anfragen, erneut in {retry_after} s')
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token-Bucket pro Schlüssel im Speicher des Prozesses
+
+    Jeder Schlüssel startet mit burst Token, jeder Versuch kostet eines,
+    pro Minute kommen per_minute Token hinzu (höchstens burst).
+    """
+
+    def __init__(self, burst, per_minute, maxsize=RATE_LIMIT_KEYS):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens, updated_at, now):
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def _wait(self, tokens):
+        """Sekunden bis zum nächsten vollen Token"""
+        return max(1, math.ceil((1 - tokens) / self.rate)) if self.rate > 0 else 3600
+
+    def take(self, key):
+        """Ein Token entnehmen; liefert 0 oder die Wartezeit in Sekunden"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = self._refill(tokens, updated_at, now)
+            wait = 0 if tokens >= 1 else self._wait(tokens)
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token-Bucket in der Tabelle rate_limits, geteilt von allen Prozessen"""
+
+    # Alle so viele Versuche volle (= überflüssige) Einträge löschen
+    PRUNE_EVERY = 1000
+
+    def __init__(self, name, burst, per_minute):
+        super().__init__(burst, per_minute)
+        self.name = name
+        self._calls = 0
+
+    def take(self, key):
+        now = time.time()
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT tokens, updated_at FROM rate_limits WHERE key = ?', (f'{self.name}:{key}',))
+            row = cursor.fetchone()
+            tokens = self._refill(row['tokens'], row['updated_at'], now) if row else self.burst
+            wait = 0 if tokens >= 1 else self._wait(tokens)
+            cursor.execute('INSERT OR REPLACE INTO rate_limits (key, tokens, updated_at) VALUES (?, ?, ?)',
+                           (f'{self.name}:{key}', tokens - 1 if not wait else tokens, now))
+
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0 and self.rate > 0:
+                cursor.execute('DELETE FROM rate_limits WHERE key LIKE ? AND updated_at < ?',
+                               (f'{self.name}:%', now - self.burst / self.rate))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return wait
+
+class LoginLimiter:
+    """Anmeldeversuche pro Client-IP und pro Benutzername begrenzen
+
+    Unbekannte Benutzernamen zählen genauso; Auth.verify_user prüft sie
+    gegen einen festen Hash, damit die Antwortzeit nichts über ihre
+    Existenz verrät.
+    """
+
+    def __init__(self, backend=LOGIN_LIMIT_BACKEND):
+        if backend == 'sqlite':
+            self.by_ip = SQLiteTokenBucket('login-ip', LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+            self.by_user = SQLiteTokenBucket('login-user', LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE)
+        else:
+            self.by_ip = TokenBucket(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+            self.by_user = TokenBucket(LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE)
+
+    def check(self, username, ip):
+        """Einen Versuch verbuchen, bei Überschreitung RateLimited auslösen
+
+        Die IP wird zuerst geprüft: ein gesperrter Client verbraucht keine
+        Versuche des Benutzernamens.
+        """
+        wait = self.by_ip.take(ip or '-')
+        if not wait:
+            wait = self.by_user.take((username or '').strip().lower()[:100])
+        if wait:
+            raise RateLimited(wait)
+
+    def check_ip(self, ip):
+        """Nur die IP belasten (z.B. Registrierung)"""
+        wait = self.by_ip.take(ip or '-')
+        if wait:
+            raise RateLimited(wait)
+
+login_limiter = LoginLimiter()
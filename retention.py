@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Aufbewahrung und Verdichtung von feed_items
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from database import get_db
+from rss_manager import RSSManager, DEFAULT_ITEM_LIMIT, SQL_BATCH_SIZE
+
+# Standard-Aufbewahrung, pro Eingang überschreibbar (inputs.retention_days/_count);
+# 0 schaltet die jeweilige Regel ab
+RETENTION_DAYS = int(os.environ.get('DUCKRSS_RETENTION_DAYS', 90))
+RETENTION_COUNT = int(os.environ.get('DUCKRSS_RETENTION_COUNT', 1000))
+
+# Die neuesten Items eines Eingangs bleiben immer erhalten: stehen sie noch
+# im Upstream-Feed, würden sie sonst beim nächsten Abruf erneut übernommen
+RETENTION_MIN_KEEP = int(os.environ.get('DUCKRSS_RETENTION_MIN_KEEP', 100))
+
+# Seiten, die PRAGMA incremental_vacuum pro Lauf freigibt (0 = alle)
+RETENTION_VACUUM_PAGES = int(os.environ.get('DUCKRSS_RETENTION_VACUUM_PAGES', 0))
+
+# Items eines Eingangs jenseits der Mindestanzahl, die zu alt oder zu viele sind
+EXPIRED_ITEMS_SQL = '''
+    SELECT id FROM (
+        SELECT id, is_custom, COALESCE(published_ts, CAST(strftime('%s', created_at) AS INTEGER)) AS item_date,
+               ROW_NUMBER() OVER (ORDER BY COALESCE(published_ts, 0) DESC, created_at DESC, id DESC) AS position
+        FROM feed_items
+        WHERE input_id = ?
+    )
+    WHERE is_custom = 0 AND position > ? AND (position > ? OR item_date < ?)
+'''
+
+# Sichtbares Fenster eines Ausgangs (erste Seite des öffentlichen Feeds)
+VISIBLE_ITEMS_SQL = '''
+    SELECT item_id FROM output_timeline
+    WHERE output_id = ?
+    ORDER BY published_ts DESC, created_at DESC, item_id DESC
+    LIMIT ?
+'''
+
+class Retention:
+    """Alte Items löschen und die Datenbank anschließend verdichten
+
+    Pro Eingang gilt ein Höchstalter (Tage) und eine Höchstanzahl. Nie
+    gelöscht werden eigene Artikel (is_custom), Items im sichtbaren Fenster
+    eines Ausgangs (outputs.item_limit) und die neuesten RETENTION_MIN_KEEP
+    Items jedes Eingangs. Fremdschlüssel sind in SQLite nicht aktiv, die
+    Zuordnungen und Timeline-Zeilen werden daher ausdrücklich mitgelöscht.
+    """
+
+    @staticmethod
+    def plan(now=None):
+        """Zu löschende Items ermitteln, ohne etwas zu ändern
+
+        Liefert einen Bericht: Liste pro Eingang (id, name, items, expired,
+        protected) und die IDs aller zu löschenden Items.
+        """
+        now = now or datetime.now(timezone.utc)
+        conn = get_db()
+        cursor = conn.cursor()
+
+        visible = set()
+        cursor.execute('SELECT id, item_limit FROM outputs')
+        for output in cursor.fetchall():
+            cursor.execute(VISIBLE_ITEMS_SQL, (output['id'], output['item_limit'] or DEFAULT_ITEM_LIMIT))
+            visible.update(row['item_id'] for row in cursor.fetchall())
+
+        cursor.execute('''
+            SELECT i.id, i.name, i.retention_days, i.retention_count, COUNT(fi.id) AS items
+            FROM inputs i
+            LEFT JOIN feed_items fi ON fi.input_id = i.id
+            GROUP BY i.id
+        ''')
+        inputs = [dict(row) for row in cursor.fetchall()]
+
+        report = []
+        expired_ids = []
+        for input_row in inputs:
+            days = RETENTION_DAYS if input_row['retention_days'] is None else input_row['retention_days']
+            count = RETENTION_COUNT if input_row['retention_count'] is None else input_row['retention_count']
+            if not days and not count:
+                continue
+
+            cutoff = int((now - timedelta(days=days)).timestamp()) if days else None
+            keep = max(count, RETENTION_MIN_KEEP) if count else input_row['items']
+            cursor.execute(EXPIRED_ITEMS_SQL, (input_row['id'], RETENTION_MIN_KEEP, keep, cutoff))
+            candidates = [row['id'] for row in cursor.fetchall()]
+            expired = [item_id for item_id in candidates if item_id not in visible]
+
+            report.append({
+                'id': input_row['id'],
+                'name': input_row['name'],
+                'items': input_row['items'],
+                'expired': len(expired),
+                'protected': len(candidates) - len(expired),
+            })
+            expired_ids.extend(expired)
+
+        conn.close()
+        return {'inputs': report, 'item_ids': expired_ids}
+
+    @staticmethod
+    def delete_items(item_ids):
+        """Items samt Zuordnungen in Stapeln löschen (eine kurze Transaktion pro Stapel)"""
+        deleted = 0
+        changed_outputs = set()
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            for start in range(0, len(item_ids), SQL_BATCH_SIZE):
+                chunk = item_ids[start:start + SQL_BATCH_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'SELECT DISTINCT output_id FROM item_output_mapping WHERE item_id IN ({placeholders})', chunk)
+                changed_outputs.update(row['output_id'] for row in cursor.fetchall())
+                cursor.execute(f'DELETE FROM output_timeline WHERE item_id IN ({placeholders})', chunk)
+                cursor.execute(f'DELETE FROM item_output_mapping WHERE item_id IN ({placeholders})', chunk)
+                cursor.execute(f'DELETE FROM feed_items WHERE id IN ({placeholders})', chunk)
+                deleted += cursor.rowcount
+                conn.commit()
+        finally:
+            conn.close()
+        # Erste Seiten bleiben gleich, ETags und Folgeseiten ändern sich
+        RSSManager._invalidate_outputs(changed_outputs)
+        return deleted
+
+    @staticmethod
+    def compact(full=False):
+        """Freie Seiten zurückgeben, WAL kürzen und Statistiken auffrischen
+
+        full=True stellt eine ältere Datenbank einmalig per VACUUM auf
+        auto_vacuum=INCREMENTAL um (sperrt die Datenbank für die Dauer).
+        Liefert (freie Seiten vorher, freie Seiten nachher).
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('PRAGMA freelist_count')
+            before = cursor.fetchone()[0]
+            cursor.execute('PRAGMA auto_vacuum')
+            incremental = cursor.fetchone()[0] == 2
+
+            if full and not incremental:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+            elif incremental:
+                # execute() gibt pro Schritt nur eine Seite frei, executescript
+                # führt das PRAGMA vollständig aus
+                conn.executescript(f'PRAGMA incremental_vacuum({RETENTION_VACUUM_PAGES});')
+
+            cursor.execute('PRAGMA optimize')
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            cursor.execute('PRAGMA freelist_count')
+            after = cursor.fetchone()[0]
+        finally:
+            conn.close()
+        return before, after
+
+    @staticmethod
+    def run(dry_run=False, full_vacuum=False):
+        """Aufbewahrung anwenden und verdichten, liefert den Bericht aus plan()"""
+        report = Retention.plan()
+        report['deleted'] = 0
+        if not dry_run:
+            report['deleted'] = Retention.delete_items(report['item_ids'])
+            report['free_pages'] = Retention.compact(full_vacuum)
+        return report
@@ -11,14 +11,227 @@ except ImportError:
     FEEDPARSER_AVAILABLE = False
     print("Warning: feedparser not available - fetch_feed() will not work")
 
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
 import requests
-from datetime import datetime
+import os
+import fcntl
+import gzip
+import tempfile
+import random
+import statistics
+import time
+from datetime import datetime, timezone
 from database import get_db
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from cache import LRUCache, user_cache, invalidate_user
+from metrics import Counter, Histogram, instrument, timer
+from feed_xml import CONTENT_NS, ATOM_NS, render_item_xml, _xml_text, _xml_attr
 import hashlib
+import base64
+import heapq
+import itertools
+import json
 import re
 
+# Cache für gerenderte öffentliche Feeds (slug -> UTF-8 Bytes)
+# Schreibzugriffe in diesem Prozess invalidieren sofort, die TTL begrenzt
+# die Verzögerung für Änderungen aus anderen Prozessen.
+FEED_CACHE_SIZE = int(os.environ.get('DUCKRSS_FEED_CACHE_SIZE', 512))
+FEED_CACHE_TTL = int(os.environ.get('DUCKRSS_FEED_CACHE_TTL', 300))
+feed_cache = LRUCache(maxsize=FEED_CACHE_SIZE, ttl=FEED_CACHE_TTL)
+
+# Metriken (siehe metrics.py, nur mit DUCKRSS_METRICS=1)
+FEED_CACHE_TOTAL = Counter('duckrss_feed_cache_total',
+                           'Feed-Seiten: erste Seite aus dem Cache (hit), neu gerendert (miss), ältere Seite (page)',
+                           ('result',))
+FEED_RENDER_SECONDS = Histogram('duckrss_feed_render_seconds',
+                                'Rendern einer ersten Feed-Seite ohne Cache (ohne Wartezeit auf den Client)')
+FETCH_SECONDS = Histogram('duckrss_fetch_seconds', 'Abruf eines Eingangs: Download, Parsen und Speichern')
+FETCH_TOTAL = Counter('duckrss_fetches_total', 'Abrufe von Eingängen nach Ergebnis', ('status',))
+FETCH_NEW_ITEMS = Counter('duckrss_fetch_new_items_total', 'Beim Abruf neu übernommene Items')
+
+RFC822_FORMAT = '%a, %d %b %Y %H:%M:%S +0000'
+
+# Upstream-Abruf: Zeitlimit (Sekunden), maximale Größe, User-Agent
+FETCH_TIMEOUT = float(os.environ.get('DUCKRSS_FETCH_TIMEOUT', 30))
+FETCH_MAX_BYTES = int(os.environ.get('DUCKRSS_FETCH_MAX_BYTES', 10 * 1024 * 1024))
+FETCH_USER_AGENT = 'DuckRSS (+https://github.com/Change-Goose-Open-Surce-Software/duckrss)'
+
+# Adaptive Abrufintervalle (Sekunden): Grenzen, Streuung und Backoff nach Fehlern
+FETCH_MIN_INTERVAL = int(os.environ.get('DUCKRSS_FETCH_MIN_INTERVAL', 300))
+FETCH_MAX_INTERVAL = int(os.environ.get('DUCKRSS_FETCH_MAX_INTERVAL', 86400))
+FETCH_JITTER = float(os.environ.get('DUCKRSS_SCHEDULER_JITTER', 0.1))
+FETCH_MAX_BACKOFF = int(os.environ.get('DUCKRSS_SCHEDULER_MAX_BACKOFF', 86400))
+DEFAULT_FETCH_INTERVAL = 1800
+
+# sy:updatePeriod in Sekunden
+_UPDATE_PERIODS = {'hourly': 3600, 'daily': 86400, 'weekly': 604800, 'monthly': 2592000, 'yearly': 31536000}
+
+# Komprimierte Varianten der Feeds (einmal pro Änderung erzeugt, im Feed-Cache
+# bzw. beim statischen Export gespeichert); bevorzugte Kodierung zuerst
+FEED_ENCODINGS = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+GZIP_LEVEL = int(os.environ.get('DUCKRSS_GZIP_LEVEL', 9))
+BROTLI_QUALITY = int(os.environ.get('DUCKRSS_BROTLI_QUALITY', 9))
+
+# Statischer Export: ist ein Verzeichnis gesetzt, wird jeder geänderte Ausgang
+# als <slug>.xml (+ .xml.gz, .xml.br) für einen vorgeschalteten Webserver geschrieben
+EXPORT_DIR = os.environ.get('DUCKRSS_EXPORT_DIR', '')
+
+# Öffentliche Basis-URL für Links in den Feeds
+PUBLIC_BASE_URL = os.environ.get('DUCKRSS_BASE_URL', 'http://localhost:5000').rstrip('/')
+
+# Items pro Seite: öffentliche Feeds (Standard, pro Ausgang in outputs.item_limit) und /feeds
+DEFAULT_ITEM_LIMIT = 50
+MAX_ITEM_LIMIT = 500
+FEEDS_PAGE_SIZE = 100
+
+# Maximale Anzahl Parameter pro IN (...)-Abfrage (SQLite-Limit: 999)
+SQL_BATCH_SIZE = 500
+
+# ============== Häufige Abfragen ==============
+# Als Konstanten abgelegt, damit `python3 -m rss_manager check-plans` ihre
+# Abfragepläne gegen das aktuelle Schema prüfen kann.
+
+USER_INPUTS_SQL = 'SELECT * FROM inputs WHERE user_id = ? ORDER BY created_at DESC'
+
+USER_OUTPUTS_SQL = 'SELECT * FROM outputs WHERE user_id = ? ORDER BY created_at DESC'
+
+# Sortierung und Keyset-Bedingung für seitenweises Blättern: der Cursor ist
+# der Sortierschlüssel des letzten Items der vorherigen Seite
+ITEM_ORDER = "COALESCE(fi.published_ts, 0) DESC, fi.created_at DESC, fi.id DESC"
+ITEM_BEFORE = "AND (COALESCE(fi.published_ts, 0), fi.created_at, fi.id) < (?, ?, ?)"
+
+# Feeds kommen aus der materialisierten Timeline (Primärschlüssel =
+# output_id + Sortierschlüssel), gleiche Reihenfolge wie ITEM_ORDER
+_OUTPUT_ITEMS_TEMPLATE = '''
+    SELECT item_id AS id, published_ts, created_at, item_xml
+    FROM output_timeline
+    WHERE output_id = ? {before}
+    ORDER BY published_ts DESC, created_at DESC, item_id DESC
+    LIMIT ?
+'''
+OUTPUT_ITEMS_SQL = _OUTPUT_ITEMS_TEMPLATE.format(before='')
+OUTPUT_ITEMS_BEFORE_SQL = _OUTPUT_ITEMS_TEMPLATE.format(
+    before='AND (published_ts, created_at, item_id) < (?, ?, ?)')
+
+OUTPUT_VALIDATORS_SQL = '''
+    SELECT o.id, o.created_at, o.revision, o.updated_at,
+           COUNT(iom.id) AS item_count,
+           MAX(iom.id) AS last_mapping_id,
+           MAX(iom.added_at) AS last_added
+    FROM outputs o
+    LEFT JOIN item_output_mapping iom ON iom.output_id = o.id
+    WHERE o.slug = ?
+    GROUP BY o.id
+'''
+
+# /feeds: pro Quelle (eigene Items des Benutzers, jeder seiner Eingänge)
+# liefert der Sortierindex (Migration 12) die IDs einer Seite bereits
+# geordnet; get_items_page mischt sie und holt nur für diese IDs die
+# Metadaten. Die zusätzliche Bedingung auf COALESCE(published_ts, 0) macht
+# den Keyset-Vergleich zu einem Bereich im Index.
+_ITEM_PAGE_TEMPLATE = '''
+    SELECT fi.id, COALESCE(fi.published_ts, 0) AS published_ts, fi.created_at
+    FROM feed_items fi
+    WHERE {source} {before}
+    ORDER BY {order}
+    LIMIT ?
+'''
+_ITEM_PAGE_BEFORE = "AND COALESCE(fi.published_ts, 0) <= ? " + ITEM_BEFORE
+USER_ITEM_IDS_SQL = _ITEM_PAGE_TEMPLATE.format(source='fi.user_id = ?', before='', order=ITEM_ORDER)
+USER_ITEM_IDS_BEFORE_SQL = _ITEM_PAGE_TEMPLATE.format(
+    source='fi.user_id = ?', before=_ITEM_PAGE_BEFORE, order=ITEM_ORDER)
+INPUT_ITEM_IDS_SQL = _ITEM_PAGE_TEMPLATE.format(source='fi.input_id = ?', before='', order=ITEM_ORDER)
+INPUT_ITEM_IDS_BEFORE_SQL = _ITEM_PAGE_TEMPLATE.format(
+    source='fi.input_id = ?', before=_ITEM_PAGE_BEFORE, order=ITEM_ORDER)
+
+USER_INPUT_IDS_SQL = 'SELECT id FROM inputs WHERE user_id = ?'
+
+# Metadaten der Items einer Seite; die Reihenfolge stellt get_items_page her
+USER_ITEMS_TEMPLATE = '''
+    SELECT 
+        fi.*,
+        i.name as input_name,
+        GROUP_CONCAT(o.name) as output_names
+    FROM feed_items fi
+    LEFT JOIN inputs i ON fi.input_id = i.id
+    LEFT JOIN item_output_mapping iom ON fi.id = iom.item_id
+    LEFT JOIN outputs o ON iom.output_id = o.id
+    WHERE fi.id IN ({placeholders})
+    GROUP BY fi.id
+'''
+
+FAN_OUT_SQL = '''
+    INSERT OR IGNORE INTO item_output_mapping (item_id, output_id)
+    SELECT fi.id, iom.output_id
+    FROM feed_items fi
+    JOIN input_output_mapping iom ON iom.input_id = fi.input_id
+    WHERE fi.input_id = ? AND fi.id > ?
+'''
+
+# Timeline-Zeilen aus den normalisierten Tabellen erzeugen bzw. auffrischen
+_TIMELINE_COLUMNS = 'output_id, published_ts, created_at, item_id, item_xml'
+_TIMELINE_SELECT = '''
+    SELECT iom.output_id AS output_id, COALESCE(fi.published_ts, 0), fi.created_at, fi.id AS item_id, fi.item_xml
+    FROM item_output_mapping iom
+    JOIN feed_items fi ON fi.id = iom.item_id
+'''
+_TIMELINE_INSERT_TEMPLATE = f'INSERT OR REPLACE INTO output_timeline ({_TIMELINE_COLUMNS}) {_TIMELINE_SELECT} {{where}}'
+TIMELINE_FAN_OUT_SQL = _TIMELINE_INSERT_TEMPLATE.format(where='WHERE fi.input_id = ? AND fi.id > ?')
+TIMELINE_ITEM_SQL = _TIMELINE_INSERT_TEMPLATE.format(where='WHERE iom.item_id = ?')
+TIMELINE_SHARE_SQL = _TIMELINE_INSERT_TEMPLATE.format(where='WHERE iom.item_id = ? AND iom.output_id = ?')
+TIMELINE_OUTPUT_SQL = _TIMELINE_INSERT_TEMPLATE.format(where='WHERE iom.output_id = ?')
+TIMELINE_ALL_SQL = _TIMELINE_INSERT_TEMPLATE.format(where='')
+
+# Konsistenzprüfung: (output_id, item_id) fehlender/veralteter bzw. überzähliger Zeilen
+TIMELINE_MISSING_SQL = f'''
+    SELECT output_id, item_id FROM ({_TIMELINE_SELECT} EXCEPT SELECT {_TIMELINE_COLUMNS} FROM output_timeline)
+'''
+TIMELINE_STALE_SQL = f'''
+    SELECT output_id, item_id FROM (SELECT {_TIMELINE_COLUMNS} FROM output_timeline EXCEPT {_TIMELINE_SELECT})
+'''
+
+# Neue Eingänge haben noch kein next_fetch_at und sind sofort fällig.
+# Weitere Seiten beginnen nach (due_at, id) der letzten Zeile der vorherigen.
+_DUE_INPUTS_TEMPLATE = '''
+    SELECT id, feed_url, COALESCE(next_fetch_at, 0) AS due_at FROM inputs
+    WHERE active = 1 AND COALESCE(next_fetch_at, 0) <= ? {after}
+    ORDER BY COALESCE(next_fetch_at, 0), id
+    LIMIT ?
+'''
+DUE_INPUTS_SQL = _DUE_INPUTS_TEMPLATE.format(after='')
+DUE_INPUTS_AFTER_SQL = _DUE_INPUTS_TEMPLATE.format(
+    after='AND COALESCE(next_fetch_at, 0) >= ? AND (COALESCE(next_fetch_at, 0), id) > (?, ?)')
+
+NEXT_DUE_SQL = 'SELECT MIN(COALESCE(next_fetch_at, 0)) FROM inputs WHERE active = 1'
+
+# Name -> (SQL, Beispielparameter) für die Prüfung der Abfragepläne
+HOT_QUERIES = {
+    'get_inputs': (USER_INPUTS_SQL, (1,)),
+    'get_outputs': (USER_OUTPUTS_SQL, (1,)),
+    'get_output_feed': (OUTPUT_ITEMS_SQL, (1, 50)),
+    'get_output_feed (Seite)': (OUTPUT_ITEMS_BEFORE_SQL, (1, 0, '', 0, 50)),
+    'get_output_validators': (OUTPUT_VALIDATORS_SQL, ('feed',)),
+    'get_all_items (Eingänge)': (USER_INPUT_IDS_SQL, (1,)),
+    'get_all_items (eigene Items)': (USER_ITEM_IDS_SQL, (1, 101)),
+    'get_all_items (eigene Items, Seite)': (USER_ITEM_IDS_BEFORE_SQL, (1, 0, 0, '', 0, 101)),
+    'get_all_items (Eingang)': (INPUT_ITEM_IDS_SQL, (1, 101)),
+    'get_all_items (Eingang, Seite)': (INPUT_ITEM_IDS_BEFORE_SQL, (1, 0, 0, '', 0, 101)),
+    'get_all_items (Metadaten)': (USER_ITEMS_TEMPLATE.format(placeholders='?, ?, ?'), (1, 2, 3)),
+    'fetch_feed (Zuordnung)': (FAN_OUT_SQL, (1, 0)),
+    'fetch_feed (Timeline)': (TIMELINE_FAN_OUT_SQL, (1, 0)),
+    'create_custom_item (Timeline)': (TIMELINE_ITEM_SQL, (1,)),
+    'share_item_to_output (Timeline)': (TIMELINE_SHARE_SQL, (1, 1)),
+    'get_due_inputs': (DUE_INPUTS_SQL, (0, 100)),
+    'get_due_inputs (Seite)': (DUE_INPUTS_AFTER_SQL, (0, 0, 0, 0, 100)),
+    'next_due_time': (NEXT_DUE_SQL, ()),
+}
+
+@instrument
 class RSSManager:
     
     @staticmethod
@@ -33,43 +246,93 @@ class RSSManager:
         input_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        invalidate_user(user_id, 'inputs')
         return input_id
     
     @staticmethod
     def get_inputs(user_id):
-        """Alle Eingänge eines Benutzers"""
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM inputs WHERE user_id = ? ORDER BY created_at DESC', (user_id,))
-        inputs = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return inputs
+        """Alle Eingänge eines Benutzers (aus user_cache)"""
+        inputs = user_cache.get(('inputs', user_id))
+        if inputs is None:
+            conn = get_db()
+            cursor = conn.cursor()
+            cursor.execute(USER_INPUTS_SQL, (user_id,))
+            inputs = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            user_cache.set(('inputs', user_id), inputs)
+        return [dict(row) for row in inputs]
     
     @staticmethod
-    def create_output(user_id, name, description=''):
+    def create_output(user_id, name, description='', item_limit=DEFAULT_ITEM_LIMIT):
         """Neuen Feed-Ausgang erstellen"""
         slug = RSSManager._create_slug(name)
         
         conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO outputs (user_id, name, slug, description)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, name, slug, description))
+            INSERT INTO outputs (user_id, name, slug, description, item_limit)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, name, slug, description, RSSManager._clamp_limit(item_limit)))
         output_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        invalidate_user(user_id, 'outputs')
+        RSSManager._invalidate_outputs([output_id])
         return output_id, slug
     
     @staticmethod
     def get_outputs(user_id):
-        """Alle Ausgänge eines Benutzers"""
+        """Alle Ausgänge eines Benutzers (aus user_cache)"""
+        outputs = user_cache.get(('outputs', user_id))
+        if outputs is None:
+            conn = get_db()
+            cursor = conn.cursor()
+            cursor.execute(USER_OUTPUTS_SQL, (user_id,))
+            outputs = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            user_cache.set(('outputs', user_id), outputs)
+        return [dict(row) for row in outputs]
+    
+    @staticmethod
+    def set_output_item_limit(user_id, output_id, item_limit):
+        """Anzahl Items im öffentlichen Feed eines Ausgangs ändern"""
         conn = get_db()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM outputs WHERE user_id = ? ORDER BY created_at DESC', (user_id,))
-        outputs = [dict(row) for row in cursor.fetchall()]
+        # Neue Revision: der Feed ändert sich, also auch ETag und Last-Modified
+        cursor.execute('''
+            UPDATE outputs SET item_limit = ?, revision = revision + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND user_id = ?
+        ''', (RSSManager._clamp_limit(item_limit), output_id, user_id))
+        conn.commit()
         conn.close()
-        return outputs
+        invalidate_user(user_id, 'outputs')
+        RSSManager._invalidate_outputs([output_id])
+    
+    @staticmethod
+    def set_input_retention(user_id, input_id, retention_days, retention_count):
+        """Aufbewahrung eines Eingangs ändern (leer = Standard, 0 = unbegrenzt)"""
+        def parse(value):
+            try:
+                return max(int(value), 0)
+            except (TypeError, ValueError):
+                return None
+        
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('UPDATE inputs SET retention_days = ?, retention_count = ? WHERE id = ? AND user_id = ?',
+                       (parse(retention_days), parse(retention_count), input_id, user_id))
+        conn.commit()
+        conn.close()
+        invalidate_user(user_id, 'inputs')
+    
+    @staticmethod
+    def _clamp_limit(item_limit):
+        """Item-Limit auf den erlaubten Bereich begrenzen"""
+        try:
+            item_limit = int(item_limit)
+        except (TypeError, ValueError):
+            return DEFAULT_ITEM_LIMIT
+        return max(1, min(item_limit, MAX_ITEM_LIMIT))
     
     @staticmethod
     def link_input_to_output(input_id, output_id):
@@ -84,67 +347,346 @@ class RSSManager:
             conn.commit()
         except:
             pass  # Bereits verknüpft
+        cursor.execute('SELECT user_id FROM inputs WHERE id = ?', (input_id,))
+        owner = cursor.fetchone()
         conn.close()
+        if owner:
+            invalidate_user(owner['user_id'], 'inputs', 'outputs')
+        RSSManager._invalidate_outputs([output_id])
     
     @staticmethod
-    def fetch_feed(input_id):
-        """Feed von URL abrufen und Items speichern"""
+    def fetch_feed(input_id, parse=None):
+        """Feed von URL abrufen und Items speichern
+        
+        Download, Parsen und Speichern sind getrennt: parse ist eine optionale
+        Funktion (bytes, headers) -> parse_feed()-Ergebnis, über die der
+        Scheduler das CPU-lastige Parsen an einen Prozess-Pool abgibt.
+        """
         if not FEEDPARSER_AVAILABLE:
             print("Error: feedparser module not available")
             return False
-            
+        
         conn = get_db()
         cursor = conn.cursor()
-        
         cursor.execute('SELECT * FROM inputs WHERE id = ?', (input_id,))
-        input_feed = dict(cursor.fetchone())
+        input_feed = cursor.fetchone()
+        conn.close()
+        
+        if not input_feed:
+            return False
         
         try:
-            feed = feedparser.parse(input_feed['feed_url'])
+            input_feed = dict(input_feed)
+            with timer(FETCH_SECONDS):
+                response = RSSManager._download(input_feed)
+                return RSSManager.process_download(input_feed, response, parse)
+        except Exception as e:
+            FETCH_TOTAL.inc(status='error')
+            print(f"Fehler beim Abrufen des Feeds: {e}")
+            return False
+        finally:
+            # last_fetch wird auf den Seiten Dashboard und Eingänge angezeigt
+            invalidate_user(input_feed['user_id'], 'inputs')
+    
+    @staticmethod
+    def process_download(input_feed, response, parse=None):
+        """Heruntergeladenen Feed (siehe _download) parsen und speichern
+        
+        input_feed ist die Zeile aus inputs (mindestens id und content_hash).
+        """
+        input_id = input_feed['id']
+        
+        # Bedingter Abruf: Server antwortet mit 304 wenn unverändert
+        if response['status'] == 304:
+            RSSManager._store_feed(input_id, [], response)
+            FETCH_TOTAL.inc(status='not_modified')
+            return True
+        if response['status'] >= 400:
+            FETCH_TOTAL.inc(status='http_error')
+            print(f"Fehler beim Abrufen des Feeds: HTTP {response['status']}")
+            return False
+        
+        # Byte-identisch zum letzten Abruf (Server ohne ETag/Last-Modified):
+        # weder parsen noch Items schreiben
+        response['content_hash'] = hashlib.sha256(response['body']).hexdigest()
+        if response['content_hash'] == input_feed.get('content_hash'):
+            RSSManager._store_feed(input_id, [], response)
+            FETCH_TOTAL.inc(status='unchanged')
+            return True
+        
+        parsed = (parse or parse_feed)(response['body'], _parse_headers(response))
+        if parsed['error'] and not parsed['entries']:
+            FETCH_TOTAL.inc(status='parse_error')
+            print(f"Fehler beim Abrufen des Feeds: {parsed['error']}")
+            return False
+        
+        response['ttl'] = parsed.get('ttl')
+        RSSManager._store_feed(input_id, parsed['entries'], response)
+        FETCH_TOTAL.inc(status='ok')
+        return True
+    
+    @staticmethod
+    def _download(input_feed):
+        """Upstream-Feed mit gespeicherten Validatoren abrufen
+        
+        Liefert status, body (Bytes, höchstens FETCH_MAX_BYTES), die neuen
+        Validatoren etag/last_modified sowie url (nach Weiterleitungen) und
+        content_type für das Parsen.
+        """
+        headers = RSSManager._request_headers(input_feed)
+        with requests.get(input_feed['feed_url'], headers=headers,
+                          timeout=FETCH_TIMEOUT, stream=True) as response:
+            body = bytearray()
+            if response.status_code == 200:
+                for chunk in response.iter_content(chunk_size=65536):
+                    body += chunk
+                    if len(body) > FETCH_MAX_BYTES:
+                        raise ValueError(f'Feed größer als {FETCH_MAX_BYTES} Bytes')
             
-            for entry in feed.entries:
-                guid = entry.get('id', entry.get('link', ''))
-                if not guid:
-                    guid = hashlib.md5(entry.get('title', '').encode()).hexdigest()
-                
-                title = entry.get('title', 'Kein Titel')
-                link = entry.get('link', '')
-                description = entry.get('summary', entry.get('description', ''))
-                content = entry.get('content', [{}])[0].get('value', description) if 'content' in entry else description
-                author = entry.get('author', '')
-                
-                # Datum parsen
-                published = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    published = datetime(*entry.published_parsed[:6])
-                
-                # Item speichern
-                try:
-                    cursor.execute('''
-                        INSERT INTO feed_items (input_id, guid, title, link, description, content, author, published)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (input_id, guid, title, link, description, content, author, published))
-                    item_id = cursor.lastrowid
-                    
-                    # Automatisch zu allen verknüpften Ausgängen hinzufügen
-                    cursor.execute('''
-                        INSERT INTO item_output_mapping (item_id, output_id)
-                        SELECT ?, output_id FROM input_output_mapping WHERE input_id = ?
-                    ''', (item_id, input_id))
-                except:
-                    pass  # Item existiert bereits
+            return {
+                'status': response.status_code,
+                'body': bytes(body),
+                'etag': response.headers.get('ETag', input_feed.get('etag')),
+                'last_modified': response.headers.get('Last-Modified', input_feed.get('last_modified')),
+                'max_age': _max_age(response.headers.get('Cache-Control')),
+                'url': response.url,
+                'content_type': response.headers.get('Content-Type'),
+            }
+    
+    @staticmethod
+    def _request_headers(input_feed):
+        """HTTP-Header für den (bedingten) Abruf eines Eingangs"""
+        headers = {'User-Agent': FETCH_USER_AGENT}
+        if input_feed.get('etag'):
+            headers['If-None-Match'] = input_feed['etag']
+        if input_feed.get('last_modified'):
+            headers['If-Modified-Since'] = input_feed['last_modified']
+        return headers
+    
+    @staticmethod
+    def _store_feed(input_id, entries, response):
+        """Geparste Einträge speichern, last_fetch und Validatoren aktualisieren"""
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            # Schreibsperre vorab: eine lesende Transaktion, die später schreiben
+            # will, scheitert bei parallelen Abrufen sofort an "database is
+            # locked" (busy_timeout greift beim Hochstufen nicht)
+            cursor.execute('BEGIN IMMEDIATE')
+            new_items, updated_ids = RSSManager._store_entries(cursor, input_id, entries) if entries else (0, [])
             
-            # Last fetch aktualisieren
-            cursor.execute('UPDATE inputs SET last_fetch = CURRENT_TIMESTAMP WHERE id = ?', (input_id,))
+            # Ausgänge mit geänderten Items bekommen eine neue Revision (ETag)
+            changed_outputs = set()
+            for start in range(0, len(updated_ids), SQL_BATCH_SIZE):
+                chunk = updated_ids[start:start + SQL_BATCH_SIZE]
+                cursor.execute(f'''
+                    SELECT DISTINCT output_id FROM item_output_mapping
+                    WHERE item_id IN ({','.join('?' * len(chunk))})
+                ''', chunk)
+                changed_outputs.update(row['output_id'] for row in cursor.fetchall())
+            cursor.executemany('''
+                UPDATE outputs SET revision = revision + 1, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+            ''', [(output_id,) for output_id in changed_outputs])
+            
+            # Last fetch, Validatoren und Hash für den nächsten Abruf speichern
+            cursor.execute('''
+                UPDATE inputs SET last_fetch = CURRENT_TIMESTAMP, etag = ?, last_modified = ?,
+                                  content_hash = COALESCE(?, content_hash)
+                WHERE id = ?
+            ''', (response['etag'], response['last_modified'], response.get('content_hash'), input_id))
+            RSSManager._schedule_next_fetch(cursor, input_id, new_items, response)
             conn.commit()
-            return True
+            FETCH_NEW_ITEMS.inc(new_items)
             
-        except Exception as e:
-            print(f"Fehler beim Abrufen des Feeds: {e}")
-            return False
+            if new_items:
+                cursor.execute('SELECT output_id FROM input_output_mapping WHERE input_id = ?', (input_id,))
+                changed_outputs.update(row['output_id'] for row in cursor.fetchall())
+            RSSManager._invalidate_outputs(changed_outputs)
+            return new_items + len(updated_ids)
         finally:
             conn.close()
     
+    @staticmethod
+    def _store_entries(cursor, input_id, entries):
+        """Neue Einträge gesammelt speichern und den verknüpften Ausgängen zuordnen
+        
+        Bekannte GUIDs werden vorab mit wenigen Abfragen aussortiert, neue
+        Items per executemany eingefügt und anschließend in einer einzigen
+        Anweisung auf alle Ausgänge des Eingangs verteilt. Bekannte Items
+        dieses Eingangs mit geändertem Inhalts-Hash werden aktualisiert.
+        
+        Liefert (Anzahl neuer Items, IDs aktualisierter Items).
+        """
+        # Doppelte GUIDs innerhalb des Feeds: erster Eintrag gewinnt
+        unique = {}
+        for entry in entries:
+            unique.setdefault(entry[0], entry)
+        
+        known = {}
+        guids = list(unique)
+        for start in range(0, len(guids), SQL_BATCH_SIZE):
+            chunk = guids[start:start + SQL_BATCH_SIZE]
+            cursor.execute(f'''
+                SELECT id, guid, input_id, content_hash FROM feed_items
+                WHERE guid IN ({','.join('?' * len(chunk))})
+            ''', chunk)
+            known.update((row['guid'], row) for row in cursor.fetchall())
+        
+        # Gleiche GUID, anderer Inhalt: Item an Ort und Stelle aktualisieren
+        # (nur Items dieses Eingangs, fremde GUIDs bleiben unangetastet)
+        updates = [
+            entry[1:] + (known[guid]['id'],)
+            for guid, entry in unique.items()
+            if guid in known and known[guid]['input_id'] == input_id
+            and known[guid]['content_hash'] != entry[-1]
+        ]
+        if updates:
+            cursor.executemany('''
+                UPDATE feed_items
+                SET title = ?, link = ?, description = ?, content = ?, author = ?,
+                    published = ?, published_ts = ?, pub_date = ?, item_xml = ?, content_hash = ?
+                WHERE id = ?
+            ''', updates)
+        updated_ids = [update[-1] for update in updates]
+        
+        # Der Sortierschlüssel kann sich mit published geändert haben:
+        # Timeline-Zeilen der Items ersetzen statt aktualisieren
+        cursor.executemany('DELETE FROM output_timeline WHERE item_id = ?', [(item_id,) for item_id in updated_ids])
+        cursor.executemany(TIMELINE_ITEM_SQL, [(item_id,) for item_id in updated_ids])
+        
+        new_entries = [entry for guid, entry in unique.items() if guid not in known]
+        if not new_entries:
+            return 0, updated_ids
+        
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM feed_items')
+        last_id = cursor.fetchone()[0]
+        
+        cursor.executemany('''
+            INSERT OR IGNORE INTO feed_items
+                (input_id, guid, title, link, description, content, author,
+                 published, published_ts, pub_date, item_xml, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(input_id,) + entry for entry in new_entries])
+        inserted = cursor.rowcount
+        
+        # Automatisch zu allen verknüpften Ausgängen hinzufügen
+        cursor.execute(FAN_OUT_SQL, (input_id, last_id))
+        cursor.execute(TIMELINE_FAN_OUT_SQL, (input_id, last_id))
+        
+        return inserted, updated_ids
+    
+    @staticmethod
+    def _schedule_next_fetch(cursor, input_id, new_items, response):
+        """Statistik eines erfolgreichen Abrufs pflegen und next_fetch_at setzen
+        
+        Grundlage ist der beobachtete Abstand zwischen Veröffentlichungen
+        (Median der letzten 20 Items, abgerufen wird doppelt so oft). Upstream-
+        Vorgaben (<ttl>, sy:updatePeriod, Cache-Control max-age) sind eine
+        Untergrenze. Liefern Abrufe fast nie Neues, wird das Intervall
+        verlängert, bei vielen neuen Items pro Abruf verkürzt.
+        """
+        cursor.execute('''
+            SELECT fetch_interval, avg_new_items, publish_interval, upstream_ttl
+            FROM inputs WHERE id = ?
+        ''', (input_id,))
+        stats = cursor.fetchone()
+        
+        # Gleitender Mittelwert neuer Items pro Abruf
+        avg_new_items = new_items if stats['avg_new_items'] is None else 0.7 * stats['avg_new_items'] + 0.3 * new_items
+        
+        publish_interval = stats['publish_interval']
+        if new_items:
+            cursor.execute('''
+                SELECT published_ts FROM feed_items
+                WHERE input_id = ? AND published_ts IS NOT NULL
+                ORDER BY published_ts DESC LIMIT 20
+            ''', (input_id,))
+            published = [row['published_ts'] for row in cursor.fetchall()]
+            gaps = [newer - older for newer, older in zip(published, published[1:]) if newer > older]
+            if gaps:
+                publish_interval = int(statistics.median(gaps))
+        
+        hints = [value for value in (response.get('ttl'), response.get('max_age')) if value]
+        upstream_ttl = max(hints) if hints else stats['upstream_ttl']
+        
+        interval = publish_interval / 2 if publish_interval else (stats['fetch_interval'] or DEFAULT_FETCH_INTERVAL)
+        if avg_new_items < 0.1:
+            interval *= 2
+        elif avg_new_items >= 10:
+            interval /= 2
+        if upstream_ttl:
+            interval = max(interval, upstream_ttl)
+        interval = min(max(interval, FETCH_MIN_INTERVAL), FETCH_MAX_INTERVAL)
+        
+        cursor.execute('''
+            UPDATE inputs
+            SET avg_new_items = ?, publish_interval = ?, upstream_ttl = ?, next_fetch_at = ?
+            WHERE id = ?
+        ''', (avg_new_items, publish_interval, upstream_ttl, _jittered(time.time(), interval), input_id))
+    
+    @staticmethod
+    def record_fetch_result(input_id, ok):
+        """Fehlerzähler eines Eingangs nach einem Abruf pflegen
+        
+        Nach Fehlern wird next_fetch_at mit exponentiellem Backoff gesetzt,
+        nach Erfolg hat _store_feed den nächsten Termin bereits geplant.
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+        if ok:
+            cursor.execute('UPDATE inputs SET fetch_errors = 0 WHERE id = ?', (input_id,))
+        else:
+            cursor.execute('UPDATE inputs SET fetch_errors = fetch_errors + 1 WHERE id = ?', (input_id,))
+        cursor.execute('SELECT fetch_interval, fetch_errors FROM inputs WHERE id = ?', (input_id,))
+        row = cursor.fetchone()
+        if row and not ok:
+            interval = row['fetch_interval'] or DEFAULT_FETCH_INTERVAL
+            delay = min(interval * 2 ** min(row['fetch_errors'], 16), max(interval, FETCH_MAX_BACKOFF))
+            cursor.execute('UPDATE inputs SET next_fetch_at = ? WHERE id = ?',
+                           (_jittered(time.time(), delay), input_id))
+        conn.commit()
+        conn.close()
+        return row['fetch_errors'] if row else 0
+    
+    @staticmethod
+    def get_due_inputs(now=None, limit=100, after=None):
+        """Fällige aktive Eingänge (next_fetch_at erreicht oder nie abgerufen)
+        
+        after: (due_at, id) der letzten Zeile der vorherigen Seite
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+        if after is None:
+            cursor.execute(DUE_INPUTS_SQL, (int(now or time.time()), limit))
+        else:
+            cursor.execute(DUE_INPUTS_AFTER_SQL, (int(now or time.time()), after[0]) + tuple(after) + (limit,))
+        inputs = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return inputs
+    
+    @staticmethod
+    def next_due_time():
+        """Frühester next_fetch_at aller aktiven Eingänge (None = keine Eingänge)"""
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(NEXT_DUE_SQL)
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+    
+    @staticmethod
+    def fetch_due(limit=100, parse=None):
+        """Nur die fälligen Eingänge abrufen (z.B. per Cron), liefert (ok, fehlgeschlagen)"""
+        ok_count = failed = 0
+        for input_feed in RSSManager.get_due_inputs(limit=limit):
+            ok = RSSManager.fetch_feed(input_feed['id'], parse)
+            RSSManager.record_fetch_result(input_feed['id'], ok)
+            if ok:
+                ok_count += 1
+            else:
+                failed += 1
+        return ok_count, failed
+    
     @staticmethod
     def create_custom_item(user_id, title, content, output_ids):
         """Eigenen Feed-Artikel erstellen"""
@@ -152,11 +694,15 @@ class RSSManager:
         cursor = conn.cursor()
         
         guid = hashlib.md5(f"{user_id}{title}{datetime.now()}".encode()).hexdigest()
+        published = _publication_fields(datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0))
+        item_xml = render_item_xml({'guid': guid, 'title': title, 'description': content[:200],
+                                    'content': content, 'pub_date': published[2]})
         
         cursor.execute('''
-            INSERT INTO feed_items (user_id, guid, title, content, description, is_custom, published)
-            VALUES (?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP)
-        ''', (user_id, guid, title, content, content[:200]))
+            INSERT INTO feed_items
+                (user_id, guid, title, content, description, is_custom, published, published_ts, pub_date, item_xml)
+            VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
+        ''', (user_id, guid, title, content, content[:200]) + published + (item_xml,))
         
         item_id = cursor.lastrowid
         
@@ -166,14 +712,37 @@ class RSSManager:
                 INSERT INTO item_output_mapping (item_id, output_id)
                 VALUES (?, ?)
             ''', (item_id, output_id))
+        cursor.execute(TIMELINE_ITEM_SQL, (item_id,))
         
         conn.commit()
         conn.close()
+        RSSManager._invalidate_outputs(output_ids)
         return item_id
     
     @staticmethod
-    def get_output_feed(slug):
-        """RSS-Feed für Ausgang generieren"""
+    def get_output_feed(slug, before=None):
+        """RSS-Feed für Ausgang als UTF-8 Bytes (aus dem Cache oder neu gerendert)"""
+        chunks = RSSManager.stream_output_feed(slug, before)
+        return b''.join(chunks) if chunks is not None else None
+    
+    @staticmethod
+    def stream_output_feed(slug, before=None):
+        """RSS-Feed für Ausgang als Folge von UTF-8 Chunks
+        
+        Bei einem Cache-Treffer ist das eine Liste mit dem fertigen Feed,
+        sonst ein Generator, der das Ergebnis nach vollständigem Durchlauf
+        in den Cache legt. Mit before (Cursor) wird die ältere Seite nach
+        RFC 5005 geliefert; diese Seiten werden nicht gecacht.
+        Ungültige Cursor lösen ValueError aus.
+        """
+        position = RSSManager.decode_cursor(before) if before else None
+        
+        if position is None:
+            cached = feed_cache.get(slug)
+            if cached is not None:
+                FEED_CACHE_TOTAL.inc(result='hit')
+                return [cached['body']]
+        
         conn = get_db()
         cursor = conn.cursor()
         
@@ -185,45 +754,185 @@ class RSSManager:
             return None
         
         output = dict(output)
+        validators = RSSManager._load_validators(cursor, slug)
+        limit = output.get('item_limit') or DEFAULT_ITEM_LIMIT
         
-        # Items für diesen Ausgang laden
-        cursor.execute('''
-            SELECT fi.* FROM feed_items fi
-            JOIN item_output_mapping iom ON fi.id = iom.item_id
-            WHERE iom.output_id = ?
-            ORDER BY fi.published DESC, fi.created_at DESC
-            LIMIT 50
-        ''', (output['id'],))
+        # Items für diesen Ausgang laden (eins mehr, um Folgeseiten zu erkennen)
+        if position is None:
+            cursor.execute(OUTPUT_ITEMS_SQL, (output['id'], limit + 1))
+        else:
+            cursor.execute(OUTPUT_ITEMS_BEFORE_SQL, (output['id'],) + position + (limit + 1,))
         
         items = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return RSSManager._generate_rss_xml(output, items)
+        next_cursor = RSSManager.encode_cursor(items[limit - 1]) if len(items) > limit else None
+        items = items[:limit]
+        
+        if position is not None:
+            FEED_CACHE_TOTAL.inc(result='page')
+            # Nie den Parameter selbst ausgeben, nur den kanonischen Cursor
+            before = RSSManager.encode_cursor(dict(zip(('published_ts', 'created_at', 'id'), position)))
+            return RSSManager._iter_rss_xml(output, items, next_cursor, before)
+        FEED_CACHE_TOTAL.inc(result='miss')
+        return RSSManager._render_and_cache(slug, output, items, validators, next_cursor)
+    
+    @staticmethod
+    def _render_and_cache(slug, output, items, validators, next_cursor=None):
+        """Feed streamen und den fertigen Feed anschließend cachen"""
+        chunks = []
+        rendering = 0.0
+        started = time.perf_counter()
+        for chunk in RSSManager._iter_rss_xml(output, items, next_cursor):
+            chunks.append(chunk)
+            rendering += time.perf_counter() - started
+            yield chunk
+            started = time.perf_counter()
+        FEED_RENDER_SECONDS.observe(rendering)
+        feed_cache.set(slug, {'output_id': output['id'], 'body': b''.join(chunks), 'validators': validators,
+                              'encoded': {}})
+    
+    @staticmethod
+    def choose_encoding(accept_encodings):
+        """Beste unterstützte Kodierung für einen Accept-Encoding-Header (None = keine)"""
+        for encoding in FEED_ENCODINGS:
+            if accept_encodings.quality(encoding) > 0:
+                return encoding
+        return None
+    
+    @staticmethod
+    def get_encoded_feed(slug, encoding):
+        """Erste Seite eines Feeds komprimiert (gzip/br) als Bytes
+        
+        Die komprimierte Variante wird neben dem gerenderten Feed im Cache
+        abgelegt und mit ihm verworfen, komprimiert wird also einmal pro
+        Änderung statt pro Abruf.
+        """
+        entry = feed_cache.get(slug)
+        if entry is None:
+            body = RSSManager.get_output_feed(slug)
+            if body is None:
+                return None
+            entry = feed_cache.get(slug) or {'body': body, 'encoded': {}}
+        else:
+            FEED_CACHE_TOTAL.inc(result='hit')
+        
+        encoded = entry['encoded']
+        if encoding not in encoded:
+            encoded[encoding] = _compress(entry['body'], encoding)
+        return encoded[encoding]
+    
+    @staticmethod
+    def get_output_validators(slug, before=None):
+        """ETag und Last-Modified eines Ausgangs (aus dem Cache oder per Abfrage)
+        
+        Ältere Seiten ändern sich nur mit dem Ausgang selbst, ihr ETag wird
+        daher aus dem des Ausgangs und dem Cursor abgeleitet.
+        """
+        validators = None
+        cached = feed_cache.get(slug)
+        if cached is not None:
+            validators = cached['validators']
+        else:
+            conn = get_db()
+            cursor = conn.cursor()
+            validators = RSSManager._load_validators(cursor, slug)
+            conn.close()
+        
+        if validators and before:
+            page_etag = hashlib.sha1(f"{validators['etag']}:{before}".encode()).hexdigest()
+            validators = dict(validators, etag=page_etag)
+        return validators
+    
+    @staticmethod
+    def _load_validators(cursor, slug):
+        """Validatoren aus Anzahl und jüngster Zuordnung der Items berechnen"""
+        cursor.execute(OUTPUT_VALIDATORS_SQL, (slug,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        fingerprint = (f"{row['id']}:{row['item_count']}:{row['last_mapping_id']}:"
+                       f"{row['last_added']}:{row['revision']}")
+        etag = hashlib.sha1(fingerprint.encode()).hexdigest()
+        
+        # CURRENT_TIMESTAMP in SQLite ist UTC
+        changed = max(value for value in (row['last_added'], row['updated_at'], row['created_at']) if value)
+        last_modified = datetime.strptime(changed, '%Y-%m-%d %H:%M:%S')
+        return {'etag': etag, 'last_modified': last_modified.replace(tzinfo=timezone.utc)}
+    
+    @staticmethod
+    def is_not_modified(validators, if_none_match, if_modified_since):
+        """Prüfen ob der Client den aktuellen Stand bereits hat (304)"""
+        # If-None-Match hat Vorrang vor If-Modified-Since (RFC 9110)
+        if if_none_match:
+            return if_none_match.contains_weak(validators['etag'])
+        if if_modified_since:
+            return validators['last_modified'] <= if_modified_since
+        return False
     
     @staticmethod
     def get_all_items(user_id):
-        """Alle Items eines Benutzers mit Metadaten"""
+        """Alle Items eines Benutzers mit Metadaten (erste Seite)"""
+        return RSSManager.get_items_page(user_id)[0]
+    
+    @staticmethod
+    def get_items_page(user_id, before=None, limit=FEEDS_PAGE_SIZE):
+        """Eine Seite Items eines Benutzers mit Metadaten
+        
+        Liefert (items, next_cursor); next_cursor ist None auf der letzten
+        Seite. Ungültige Cursor lösen ValueError aus.
+        """
+        position = RSSManager.decode_cursor(before) if before else None
+        
         conn = get_db()
         cursor = conn.cursor()
+        cursor.execute(USER_INPUT_IDS_SQL, (user_id,))
+        sources = [(USER_ITEM_IDS_SQL, USER_ITEM_IDS_BEFORE_SQL, user_id)]
+        sources += [(INPUT_ITEM_IDS_SQL, INPUT_ITEM_IDS_BEFORE_SQL, row['id']) for row in cursor.fetchall()]
         
-        cursor.execute('''
-            SELECT 
-                fi.*,
-                i.name as input_name,
-                GROUP_CONCAT(o.name) as output_names
-            FROM feed_items fi
-            LEFT JOIN inputs i ON fi.input_id = i.id
-            LEFT JOIN item_output_mapping iom ON fi.id = iom.item_id
-            LEFT JOIN outputs o ON iom.output_id = o.id
-            WHERE fi.user_id = ? OR fi.input_id IN (SELECT id FROM inputs WHERE user_id = ?)
-            GROUP BY fi.id
-            ORDER BY fi.published DESC, fi.created_at DESC
-            LIMIT 100
-        ''', (user_id, user_id))
+        # Jede Quelle liefert höchstens limit + 1 Zeilen aus ihrem Index in
+        # Sortierreihenfolge; gemischt wird erst, wenn die Zeilen gebraucht werden
+        streams = []
+        for sql, before_sql, source_id in sources:
+            stream = conn.cursor()
+            if position is None:
+                stream.execute(sql, (source_id, limit + 1))
+            else:
+                stream.execute(before_sql, (source_id, position[0]) + position + (limit + 1,))
+            streams.append(stream)
+        merged = heapq.merge(*streams, key=lambda row: (row['published_ts'], row['created_at'], row['id']),
+                             reverse=True)
+        ids = [row['id'] for row in itertools.islice(merged, limit + 1)]
         
-        items = [dict(row) for row in cursor.fetchall()]
+        rows = {}
+        for start in range(0, len(ids), SQL_BATCH_SIZE):
+            batch = ids[start:start + SQL_BATCH_SIZE]
+            cursor.execute(USER_ITEMS_TEMPLATE.format(placeholders=', '.join('?' * len(batch))), batch)
+            rows.update((row['id'], dict(row)) for row in cursor.fetchall())
         conn.close()
-        return items
+        
+        # Zwischenzeitlich gelöschte Items fehlen einfach
+        items = [rows[item_id] for item_id in ids if item_id in rows]
+        next_cursor = RSSManager.encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return items[:limit], next_cursor
+    
+    @staticmethod
+    def encode_cursor(item):
+        """Sortierschlüssel (published_ts, created_at, id) als URL-sicheren Cursor"""
+        key = [item['published_ts'] or 0, str(item['created_at']), item['id']]
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(token):
+        """Cursor in den Sortierschlüssel zurückwandeln"""
+        try:
+            # validate=True: fremde Zeichen nicht stillschweigend überspringen
+            raw = base64.b64decode(token + '=' * (-len(token) % 4), altchars=b'-_', validate=True)
+            published_ts, created_at, item_id = json.loads(raw)
+            return (int(published_ts), str(created_at), int(item_id))
+        except (ValueError, TypeError):
+            raise ValueError('Ungültiger Cursor')
     
     @staticmethod
     def share_item_to_output(item_id, output_id):
@@ -235,12 +944,138 @@ class RSSManager:
                 INSERT INTO item_output_mapping (item_id, output_id)
                 VALUES (?, ?)
             ''', (item_id, output_id))
+            cursor.execute(TIMELINE_SHARE_SQL, (item_id, output_id))
             conn.commit()
-            return True
         except:
             return False
         finally:
             conn.close()
+        RSSManager._invalidate_outputs([output_id])
+        return True
+    
+    @staticmethod
+    def _invalidate_outputs(output_ids):
+        """Gecachte Feeds der betroffenen Ausgänge verwerfen (und ggf. neu exportieren)"""
+        output_ids = {int(output_id) for output_id in output_ids}
+        if output_ids:
+            feed_cache.discard_where(lambda entry: entry['output_id'] in output_ids)
+            if EXPORT_DIR:
+                RSSManager.export_feeds(output_ids)
+    
+    @staticmethod
+    def export_feeds(output_ids=None, export_dir=None):
+        """Feeds (Standard: alle Ausgänge) als statische Dateien schreiben
+        
+        Pro Ausgang entstehen <slug>.xml, <slug>.xml.gz und, falls brotli
+        installiert ist, <slug>.xml.br. Jede Datei wird über eine temporäre
+        Datei und os.replace ersetzt, Leser sehen nie einen halben Feed. Eine
+        Sperrdatei sorgt dafür, dass bei Schreibzugriffen aus mehreren
+        Prozessen nie ein älterer Stand einen neueren überschreibt.
+        Liefert die Anzahl exportierter Ausgänge.
+        """
+        export_dir = export_dir or EXPORT_DIR
+        conn = get_db()
+        cursor = conn.cursor()
+        if output_ids is None:
+            cursor.execute('SELECT slug FROM outputs')
+            slugs = [row['slug'] for row in cursor.fetchall()]
+        else:
+            output_ids = list(output_ids)
+            cursor.execute(f'''
+                SELECT slug FROM outputs WHERE id IN ({','.join('?' * len(output_ids))})
+            ''', output_ids)
+            slugs = [row['slug'] for row in cursor.fetchall()]
+        conn.close()
+        
+        exported = 0
+        try:
+            os.makedirs(export_dir, exist_ok=True)
+            with open(os.path.join(export_dir, '.lock'), 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                for slug in slugs:
+                    # Gerendert wird erst unter der Sperre, also mit dem neuesten Stand;
+                    # die komprimierten Varianten landen dabei auch im Feed-Cache
+                    body = RSSManager.get_output_feed(slug)
+                    if body is None:
+                        continue
+                    path = os.path.join(export_dir, f'{slug}.xml')
+                    for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+                        if encoding in FEED_ENCODINGS:
+                            _write_atomic(path + suffix, RSSManager.get_encoded_feed(slug, encoding))
+                    _write_atomic(path, body)
+                    exported += 1
+        except OSError as e:
+            print(f"Fehler beim Exportieren der Feeds: {e}")
+        return exported
+    
+    @staticmethod
+    def rebuild_timeline(output_id=None):
+        """Timeline (aller oder eines Ausgangs) aus den normalisierten Tabellen neu aufbauen
+        
+        Liefert die Anzahl geschriebener Zeilen.
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            if output_id is None:
+                cursor.execute('DELETE FROM output_timeline')
+                cursor.execute(TIMELINE_ALL_SQL)
+            else:
+                cursor.execute('DELETE FROM output_timeline WHERE output_id = ?', (output_id,))
+                cursor.execute(TIMELINE_OUTPUT_SQL, (output_id,))
+            rows = cursor.rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        if output_id is None:
+            feed_cache.clear()
+            if EXPORT_DIR:
+                RSSManager.export_feeds()
+        else:
+            RSSManager._invalidate_outputs([output_id])
+        return rows
+    
+    @staticmethod
+    def check_timeline():
+        """Timeline mit item_output_mapping + feed_items vergleichen
+        
+        Liefert (fehlend, überzählig): Zeilen (output_id, item_id), die in
+        der Timeline fehlen oder veraltet sind bzw. dort keine Entsprechung
+        mehr haben. Beide Listen leer bedeutet: Timeline ist konsistent.
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(TIMELINE_MISSING_SQL)
+        missing = [tuple(row) for row in cursor.fetchall()]
+        cursor.execute(TIMELINE_STALE_SQL)
+        stale = [tuple(row) for row in cursor.fetchall()]
+        conn.close()
+        return missing, stale
+    
+    @staticmethod
+    def check_query_plans():
+        """Abfragepläne der häufigen Abfragen auf Full Table Scans prüfen
+        
+        Liefert eine Liste (Name, Planzeile) aller Schritte, die eine Tabelle
+        vollständig durchlaufen oder für ORDER BY nachträglich sortieren
+        (Temp-B-Tree statt Index: LIMIT greift erst nach allen Zeilen). Eine
+        leere Liste bedeutet: alle Abfragen laufen über Indizes.
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+        scans = []
+        for name, (sql, params) in HOT_QUERIES.items():
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            for row in cursor.fetchall():
+                detail = row['detail']
+                # "SCAN x USING (COVERING) INDEX" ist ein Index-Scan,
+                # "SCAN x" ohne Index ein Full Table Scan
+                if detail.startswith('SCAN ') and 'INDEX' not in detail:
+                    scans.append((name, detail))
+                elif 'TEMP B-TREE FOR ORDER BY' in detail:
+                    scans.append((name, detail))
+        conn.close()
+        return scans
     
     @staticmethod
     def _create_slug(name):
@@ -253,64 +1088,281 @@ class RSSManager:
     
     @staticmethod
     def _generate_rss_xml(output, items):
-        """RSS 2.0 XML generieren - FIXED VERSION"""
-        # Namespace für content:encoded registrieren
-        ET.register_namespace('content', 'http://purl.org/rss/1.0/modules/content/')
-        
-        rss = ET.Element('rss', {'version': '2.0'})
-        channel = ET.SubElement(rss, 'channel')
+        """RSS 2.0 XML als UTF-8 Bytes generieren"""
+        return b''.join(RSSManager._iter_rss_xml(output, items))
+    
+    @staticmethod
+    def _iter_rss_xml(output, items, next_cursor=None, before=None):
+        """RSS 2.0 XML schrittweise als UTF-8 Chunks erzeugen
         
+        Pro Item wird ein Chunk geliefert, der komplette Feed liegt nie
+        als Baum oder Zwischenstring im Speicher. Items mit gespeichertem
+        Fragment (item_xml) werden nicht erneut serialisiert. Folgeseiten werden als
+        atom:link rel="next" angegeben (RFC 5005, Paged Feeds).
+        """
         # Sicherstellen dass description nicht None ist
         description = output.get('description') or ''
+        feed_url = _xml_attr(f"{PUBLIC_BASE_URL}/exit/{output['slug']}.xml")
+        
+        links = f'    <atom:link rel="first" href="{feed_url}"/>\n'
+        if before:
+            links += f'    <atom:link rel="self" href="{feed_url}?before={_xml_attr(before)}"/>\n'
+        else:
+            links += f'    <atom:link rel="self" href="{feed_url}"/>\n'
+        if next_cursor:
+            links += f'    <atom:link rel="next" href="{feed_url}?before={_xml_attr(next_cursor)}"/>\n'
         
-        ET.SubElement(channel, 'title').text = output['name']
-        ET.SubElement(channel, 'description').text = description
-        ET.SubElement(channel, 'link').text = f"http://localhost:5000/exit/{output['slug']}.xml"
-        ET.SubElement(channel, 'lastBuildDate').text = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0000')
-        ET.SubElement(channel, 'generator').text = 'DuckRSS'
+        yield (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<rss xmlns:content="{CONTENT_NS}" xmlns:atom="{ATOM_NS}" version="2.0">\n'
+            '  <channel>\n'
+            f'    <title>{_xml_text(output["name"])}</title>\n'
+            f'    <description>{_xml_text(description)}</description>\n'
+            f'    <link>{feed_url}</link>\n'
+            f'{links}'
+            f'    <lastBuildDate>{datetime.now(timezone.utc).strftime(RFC822_FORMAT)}</lastBuildDate>\n'
+            '    <generator>DuckRSS</generator>\n'
+        ).encode('utf-8')
         
+        # Gespeicherte Fragmente unverändert übernehmen
         for item in items:
-            item_elem = ET.SubElement(channel, 'item')
-            
-            # Title ist required
-            ET.SubElement(item_elem, 'title').text = item['title'] or 'Kein Titel'
-            
-            # Link ist optional
-            if item.get('link'):
-                ET.SubElement(item_elem, 'link').text = item['link']
-            
-            # Description - sicherstellen dass es nicht None ist
-            description_text = item.get('description') or ''
-            ET.SubElement(item_elem, 'description').text = description_text
-            
-            # Content:encoded - mit korrektem Namespace
-            if item.get('content'):
-                content_elem = ET.SubElement(item_elem, '{http://purl.org/rss/1.0/modules/content/}encoded')
-                content_elem.text = item['content']
-            
-            # Author ist optional
-            if item.get('author'):
-                ET.SubElement(item_elem, 'author').text = item['author']
-            
-            # GUID ist required
-            ET.SubElement(item_elem, 'guid').text = item['guid']
-            
-            # PubDate ist optional
-            if item.get('published'):
-                try:
-                    if isinstance(item['published'], str):
-                        pub_date = datetime.fromisoformat(item['published'])
-                    else:
-                        pub_date = item['published']
-                    ET.SubElement(item_elem, 'pubDate').text = pub_date.strftime('%a, %d %b %Y %H:%M:%S +0000')
-                except:
-                    pass  # Skip bei Fehler
-        
-        # XML formatieren
-        xml_str = ET.tostring(rss, encoding='unicode')
+            yield item.get('item_xml') or render_item_xml(item)
+        
+        yield b'  </channel>\n</rss>\n'
+
+
+def _parse_headers(response):
+    """Antwort-Header für feedparser aus einem Download (siehe _download)
+    
+    content-location ist die Basis für relative Links, GUIDs und URLs im
+    Inhalt, content-type liefert den Zeichensatz.
+    """
+    headers = {}
+    if response.get('url'):
+        headers['content-location'] = response['url']
+    if response.get('content_type'):
+        headers['content-type'] = response['content_type']
+    return headers
+
+def parse_feed(body, headers=None):
+    """Rohen Feed parsen und Einträge als kompakte Tupel liefern
+    
+    headers sind die Antwort-Header (siehe _parse_headers). Läuft ohne
+    Datenbank- oder Netzwerkzugriff und ist damit für einen Prozess-Pool
+    geeignet; Argumente und Ergebnis sind picklebar.
+    """
+    feed = feedparser.parse(body, response_headers=headers or {})
+    error = str(feed.get('bozo_exception', 'Ungültiger Feed')) if feed.get('bozo') else None
+    return {
+        'entries': [_normalize_entry(entry) for entry in feed.entries],
+        'error': error,
+        'ttl': _feed_ttl(feed.feed),
+    }
+
+
+def _feed_ttl(channel):
+    """Vom Feed gewünschter Mindestabstand in Sekunden (<ttl>, sy:updatePeriod)"""
+    hints = []
+    try:
+        hints.append(int(channel.get('ttl')) * 60)
+    except (TypeError, ValueError):
+        pass
+    period = _UPDATE_PERIODS.get(str(channel.get('sy_updateperiod', '')).strip().lower())
+    if period:
         try:
-            dom = minidom.parseString(xml_str)
-            return dom.toprettyxml(indent='  ', encoding='utf-8').decode('utf-8')
-        except:
-            # Fallback: unformatiert zurückgeben
-            return '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
+            frequency = max(int(channel.get('sy_updatefrequency', 1)), 1)
+        except (TypeError, ValueError):
+            frequency = 1
+        hints.append(period // frequency)
+    return max(hints) if hints else None
+
+
+def _max_age(cache_control):
+    """max-age aus einem Cache-Control-Header in Sekunden"""
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else None
+
+
+def _jittered(now, delay):
+    """Zeitpunkt now + delay mit zufälliger Streuung als Unix-Zeit"""
+    return int(now + delay * random.uniform(1 - FETCH_JITTER, 1 + FETCH_JITTER))
+
+
+def _normalize_entry(entry):
+    """feedparser-Eintrag in ein Tupel für feed_items umwandeln"""
+    guid = entry.get('id', entry.get('link', ''))
+    if not guid:
+        guid = hashlib.md5(entry.get('title', '').encode()).hexdigest()
+    
+    title = entry.get('title', 'Kein Titel')
+    link = entry.get('link', '')
+    description = entry.get('summary', entry.get('description', ''))
+    content = entry.get('content', [{}])[0].get('value', description) if 'content' in entry else description
+    author = entry.get('author', '')
+    
+    # Datum parsen (feedparser liefert published_parsed in UTC)
+    published = None
+    if hasattr(entry, 'published_parsed') and entry.published_parsed:
+        published = datetime(*entry.published_parsed[:6])
+    
+    # Inhalts-Hash, um geänderte Einträge mit gleicher GUID zu erkennen
+    fingerprint = '\x1f'.join(str(value) for value in (title, link, description, content, author, published))
+    content_hash = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+    
+    publication = _publication_fields(published)
+    item_xml = render_item_xml({'guid': guid, 'title': title, 'link': link, 'description': description,
+                                'content': content, 'author': author, 'pub_date': publication[2]})
+    
+    return (guid, title, link, description, content, author) + publication + (item_xml, content_hash)
+
+
+def _publication_fields(published):
+    """Naives UTC-Datum als (published, published_ts, pub_date) für feed_items
+    
+    published_ts (Unix-Zeit) dient der Sortierung, pub_date (RFC 822) wird
+    unverändert ausgegeben; beim Rendern wird kein Datum mehr geparst.
+    """
+    if published is None:
+        return (None, None, None)
+    published_utc = published.replace(tzinfo=timezone.utc)
+    return (published.strftime('%Y-%m-%d %H:%M:%S'), int(published_utc.timestamp()),
+            published_utc.strftime(RFC822_FORMAT))
+
+
+def _compress(body, encoding):
+    """Feed für Content-Encoding gzip oder br komprimieren"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _write_atomic(path, data):
+    """Datei ersetzen, ohne dass Leser je einen Zwischenstand sehen"""
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.chmod(tmp_path, 0o644)  # mkstemp legt 0600 an, der Webserver muss lesen
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# ============== Kommandozeile ==============
+
+def main(argv=None):
+    """Einstiegspunkt für python -m rss_manager"""
+    import argparse
+    import logging
+    
+    parser = argparse.ArgumentParser(prog='python3 -m rss_manager', description='DuckRSS Feed-Verwaltung')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    schedule = commands.add_parser('schedule', help='Aktive Eingänge im Hintergrund abrufen')
+    schedule.add_argument('--workers', type=int, help='Anzahl paralleler Abrufe')
+    schedule.add_argument('--per-host', type=int, help='Maximal parallele Abrufe pro Host')
+    schedule.add_argument('--parse-processes', type=int, help='Prozesse für das Parsen (0 = in den Threads)')
+    
+    fetch_all = commands.add_parser('fetch-all', help='Alle aktiven Eingänge einmal asynchron abrufen')
+    fetch_all.add_argument('--concurrency', type=int, help='Gleichzeitige Downloads')
+    fetch_all.add_argument('--per-host', type=int, help='Gleichzeitige Verbindungen pro Host')
+    
+    fetch_due = commands.add_parser('fetch-due', help='Nur fällige Eingänge einmal abrufen (z.B. per Cron)')
+    fetch_due.add_argument('--limit', type=int, default=100, help='Maximal abzurufende Eingänge')
+    
+    commands.add_parser('check-plans', help='Abfragepläne auf Full Table Scans und Sortierungen ohne Index prüfen')
+    
+    rebuild = commands.add_parser('rebuild-timeline', help='Timeline der Ausgänge neu aufbauen')
+    rebuild.add_argument('--output', type=int, help='Nur diesen Ausgang (ID)')
+    
+    commands.add_parser('check-timeline', help='Timeline mit den normalisierten Tabellen vergleichen')
+    
+    export = commands.add_parser('export-feeds', help='Alle Feeds als statische Dateien schreiben')
+    export.add_argument('--dir', help='Zielverzeichnis (Standard: DUCKRSS_EXPORT_DIR)')
+    
+    compact = commands.add_parser('compact', help='Alte Items löschen und die Datenbank verdichten')
+    compact.add_argument('--dry-run', action='store_true', help='Nur berichten, nichts löschen')
+    compact.add_argument('--full-vacuum', action='store_true',
+                         help='Ältere Datenbank einmalig auf inkrementelles VACUUM umstellen')
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    
+    if args.command == 'schedule':
+        from scheduler import FeedScheduler
+        options = {}
+        if args.workers:
+            options['workers'] = args.workers
+        if args.per_host:
+            options['per_host'] = args.per_host
+        if args.parse_processes is not None:
+            options['parse_processes'] = args.parse_processes
+        scheduler = FeedScheduler(**options)
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+    
+    elif args.command == 'fetch-all':
+        from async_fetcher import AsyncFetcher
+        options = {}
+        if args.concurrency:
+            options['concurrency'] = args.concurrency
+        if args.per_host:
+            options['per_host'] = args.per_host
+        stats = AsyncFetcher(**options).run()
+        print(f"✓ {stats['fetched']} aktualisiert, {stats['not_modified']} unverändert, "
+              f"{stats['failed']} fehlgeschlagen in {stats['seconds']:.1f}s "
+              f"({stats['feeds_per_second']:.1f} Feeds/s)")
+    
+    elif args.command == 'fetch-due':
+        ok_count, failed = RSSManager.fetch_due(args.limit)
+        print(f"✓ {ok_count} abgerufen, {failed} fehlgeschlagen")
+    
+    elif args.command == 'check-plans':
+        scans = RSSManager.check_query_plans()
+        for name, detail in scans:
+            print(f"✗ {name}: {detail}")
+        if scans:
+            raise SystemExit(1)
+        print(f"✓ {len(HOT_QUERIES)} Abfragen ohne Full Table Scan und ohne Sortierung außerhalb eines Index")
+    
+    elif args.command == 'rebuild-timeline':
+        rows = RSSManager.rebuild_timeline(args.output)
+        print(f"✓ Timeline neu aufgebaut: {rows} Zeilen")
+    
+    elif args.command == 'check-timeline':
+        missing, stale = RSSManager.check_timeline()
+        for output_id, item_id in missing:
+            print(f"✗ Ausgang {output_id}, Item {item_id}: fehlt oder veraltet")
+        for output_id, item_id in stale:
+            print(f"✗ Ausgang {output_id}, Item {item_id}: überzählig oder veraltet")
+        if missing or stale:
+            print("→ python3 -m rss_manager rebuild-timeline")
+            raise SystemExit(1)
+        print("✓ Timeline konsistent")
+    
+    elif args.command == 'export-feeds':
+        export_dir = args.dir or EXPORT_DIR
+        if not export_dir:
+            parser.error('kein Zielverzeichnis: --dir oder DUCKRSS_EXPORT_DIR setzen')
+        count = RSSManager.export_feeds(export_dir=export_dir)
+        print(f"✓ {count} Feeds nach {export_dir} exportiert")
+    
+    elif args.command == 'compact':
+        from retention import Retention
+        report = Retention.run(dry_run=args.dry_run, full_vacuum=args.full_vacuum)
+        for row in report['inputs']:
+            if row['expired'] or row['protected']:
+                print(f"  {row['name']} (#{row['id']}): {row['expired']} von {row['items']} Items "
+                      f"abgelaufen, {row['protected']} in Ausgängen sichtbar")
+        if args.dry_run:
+            print(f"✓ Testlauf: {len(report['item_ids'])} Items würden gelöscht")
+        else:
+            before, after = report['free_pages']
+            print(f"✓ {report['deleted']} Items gelöscht, freie Seiten {before} → {after}")
+
+if __name__ == '__main__':
+    main()
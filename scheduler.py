@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - Hintergrund-Abruf aller aktiven Eingänge
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+from rss_manager import RSSManager, parse_feed
+
+logger = logging.getLogger('duckrss.scheduler')
+
+SCHEDULER_WORKERS = int(os.environ.get('DUCKRSS_SCHEDULER_WORKERS', 16))
+SCHEDULER_PER_HOST = int(os.environ.get('DUCKRSS_SCHEDULER_PER_HOST', 2))
+SCHEDULER_PARSE_PROCESSES = int(os.environ.get('DUCKRSS_SCHEDULER_PARSE_PROCESSES', os.cpu_count() or 1))
+SCHEDULER_BATCH = int(os.environ.get('DUCKRSS_SCHEDULER_BATCH', 1000))
+
+class FeedScheduler:
+    """Ruft fällige Eingänge über einen begrenzten Thread-Pool ab
+
+    Wann ein Eingang fällig ist, steht in inputs.next_fetch_at und wird nach
+    jedem Abruf von RSSManager neu geplant (adaptives Intervall bzw. Backoff
+    nach Fehlern). Pro Host laufen höchstens per_host Abrufe gleichzeitig.
+    Die Threads erledigen nur Netzwerk und Datenbank; das Parsen läuft in
+    parse_processes Prozessen (0 = im jeweiligen Thread), damit es nicht am
+    GIL hängt.
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS, per_host=SCHEDULER_PER_HOST,
+                 parse_processes=SCHEDULER_PARSE_PROCESSES, batch=SCHEDULER_BATCH):
+        self.workers = workers
+        self.per_host = per_host
+        self.parse_processes = parse_processes
+        self.batch = batch
+
+        self._in_flight = set()
+        self._host_load = {}    # host -> laufende Abrufe
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._parse_pool = None
+
+    def stop(self):
+        """Scheduler nach den laufenden Abrufen beenden"""
+        self._stop.set()
+        self._wakeup.set()
+
+    def run(self):
+        """Hauptschleife: fällige Eingänge an den Pool verteilen"""
+        logger.info('Scheduler gestartet (%d Worker, %d pro Host, %d Parser-Prozesse)',
+                    self.workers, self.per_host, self.parse_processes)
+
+        if self.parse_processes > 0:
+            # spawn statt fork: der Prozess hat bereits Threads und DB-Verbindungen
+            self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_processes,
+                                                   mp_context=multiprocessing.get_context('spawn'))
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fetch') as pool:
+            while not self._stop.is_set():
+                now = time.time()
+                for input_row in self._take_due(now):
+                    pool.submit(self._fetch, input_row)
+
+                self._wakeup.wait(timeout=self._seconds_until_next(now))
+                self._wakeup.clear()
+
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+        logger.info('Scheduler beendet')
+
+    def _parse(self, body, headers=None):
+        """Feed im Prozess-Pool parsen, nur kompakte Tupel kommen zurück"""
+        return self._parse_pool.submit(parse_feed, body, headers).result()
+
+    def _take_due(self, now):
+        """Fällige Eingänge reservieren, die Worker- und Host-Limit erlauben
+
+        Laufende oder wegen ihres Hosts übersprungene Eingänge belegen keine
+        freien Plätze: es wird seitenweise weitergelesen, bis alle Worker
+        belegt oder keine fälligen Eingänge mehr übrig sind.
+        """
+        taken = []
+        after = None
+        while True:
+            due = RSSManager.get_due_inputs(now, self.batch, after)
+            with self._lock:
+                for row in due:
+                    if len(self._in_flight) >= self.workers:
+                        return taken
+                    if row['id'] in self._in_flight:
+                        continue
+                    host = urlsplit(row['feed_url']).hostname or ''
+                    if self._host_load.get(host, 0) >= self.per_host:
+                        continue
+                    self._host_load[host] = self._host_load.get(host, 0) + 1
+                    self._in_flight.add(row['id'])
+                    taken.append(row)
+            if len(due) < self.batch:
+                return taken
+            after = (due[-1]['due_at'], due[-1]['id'])
+
+    def _seconds_until_next(self, now):
+        """Wartezeit bis zum frühesten next_fetch_at (laufende Abrufe wecken selbst)"""
+        next_due = RSSManager.next_due_time()
+        if next_due is None:
+            return 30
+        return min(max(next_due - now, 1), 30)
+
+    def _fetch(self, row):
+        """Einzelnen Eingang abrufen, RSSManager plant den nächsten Termin"""
+        input_id = row['id']
+        host = urlsplit(row['feed_url']).hostname or ''
+        ok = False
+        try:
+            ok = RSSManager.fetch_feed(input_id, parse=self._parse if self._parse_pool else None)
+        except Exception:
+            logger.exception('Abruf von Eingang %s fehlgeschlagen', input_id)
+        finally:
+            # Auch bei Fehlern (z.B. gesperrte Datenbank) neu planen und den
+            # Platz freigeben, sonst bliebe der Eingang für immer "laufend"
+            try:
+                errors = RSSManager.record_fetch_result(input_id, ok)
+                if not ok:
+                    logger.warning('Eingang %s: Fehler Nr. %d, nächster Versuch mit Backoff', input_id, errors)
+            except Exception:
+                logger.exception('Nächster Abruf von Eingang %s konnte nicht geplant werden', input_id)
+            finally:
+                with self._lock:
+                    self._in_flight.discard(input_id)
+                    self._host_load[host] -= 1
+                self._wakeup.set()
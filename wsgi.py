@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckRSS - WSGI-Einstiegspunkt
+
+gunicorn -c gunicorn.conf.py wsgi:app
+uwsgi --http :5000 --module wsgi:app --processes 4 --threads 4
+(bei uwsgi vorher einmal python3 database.py ausführen)
+"""
+
+from app import create_app
+
+app = create_app()